@@ -0,0 +1,72 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Threads for the blocking parts of the async pipeline (deck build, upload, cache I/O)
+ASYNC_BLOCKING_WORKERS = int(os.getenv("ASYNC_BLOCKING_WORKERS", str(min(32, (os.cpu_count() or 1) + 4))))
+
+
+class EventLoopThread:
+    """One asyncio loop per process, running in a daemon thread.
+
+    Sync code (Flask views, the job manager) hands coroutines to it with
+    submit()/run(), so every async deck in the process shares one loop and
+    one AsyncOpenAI connection pool instead of holding a thread each.
+    """
+
+    def __init__(self, name="ppt-async", blocking_workers=ASYNC_BLOCKING_WORKERS):
+        self.name = name
+        self.blocking_workers = blocking_workers
+        self._loop = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def loop(self):
+        """Returns the running loop, starting it on first use (and again after fork)"""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._start()
+            return self._loop
+
+    def _start(self):
+        loop = asyncio.new_event_loop()
+        # asyncio.to_thread() uses the default executor; bound it explicitly
+        loop.set_default_executor(ThreadPoolExecutor(
+            max_workers=self.blocking_workers, thread_name_prefix=f"{self.name}-blocking"
+        ))
+        started = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(loop)
+            loop.call_soon(started.set)
+            loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name=self.name, daemon=True)
+        self._thread.start()
+        started.wait()
+        self._loop = loop
+        self._pid = os.getpid()
+
+    def submit(self, coro):
+        """Schedules a coroutine on the loop; returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop())
+
+    def run(self, coro, timeout=None):
+        """Runs a coroutine on the loop and blocks the calling thread for its result"""
+        return self.submit(coro).result(timeout)
+
+    def stop(self):
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or self._pid != os.getpid():
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.run_until_complete(loop.shutdown_default_executor())
+        loop.close()
+
+
+event_loop = EventLoopThread()
@@ -0,0 +1,460 @@
+"""Offline benchmark for the PPT pipeline.
+
+Runs fullscreen.generate_presentation (threaded or asyncio pipeline),
+engine.ProfessionalPPTBuilder.build and server.py's generate_presentation
+against local fakes, so no OpenAI or Cloudinary credits are spent:
+
+  * chat completions return a canned slide plan (streamed or not) after a
+    configurable latency,
+  * image generations return a deterministic 1024x1024 PNG,
+  * Cloudinary chunk uploads are acknowledged after a configurable latency.
+
+The fakes sit at the HTTP layer (httpx.MockTransport behind the real
+RateLimitedTransport and OpenAI SDK), so parsing, pooling and rate limiting
+are all exercised. Each case runs in a fresh process so peak RSS is per case.
+
+    python benchmark.py --slides 1,5,10,20 --concurrency 1,4 --output baseline.json
+
+The server scenario also checks that each request builds its deck exactly
+once; the exit status is 1 if one didn't.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import re
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+
+DUMMY_ENV = {
+    "OPENAI_API_KEY": "sk-benchmark",
+    "CLOUDINARY_CLOUD_NAME": "benchmark",
+    "CLOUDINARY_API_KEY": "benchmark",
+    "CLOUDINARY_API_SECRET": "benchmark",
+    # Don't let the production rate limits dominate the numbers unless asked to
+    "OPENAI_IMAGE_RPM": "1000000",
+    "OPENAI_IMAGE_CONCURRENCY": "1000",
+    "OPENAI_CHAT_RPM": "1000000",
+    "OPENAI_CHAT_CONCURRENCY": "1000",
+}
+
+
+# ----------- FAKE BACKENDS -----------
+
+def canned_plan(slide_count, salt=""):
+    """Plan JSON shaped like the planner's real output"""
+    slides = []
+    for n in range(1, slide_count + 1):
+        slides.append({
+            "slide_number": n,
+            "section": f"Section {(n - 1) // 3 + 1}",
+            "title": f"Benchmark slide {n}: operational metrics and quarterly outlook",
+            "content_points": [
+                f"Point {i} for slide {n} with enough words to wrap across a realistic text box width"
+                for i in range(1, 5)
+            ],
+            "slide_type": "image_slide" if n % 2 == 0 else "text_heavy",
+            "has_image": n % 2 == 0,
+            "image_concept": f"Abstract corporate illustration {salt} #{n}",
+        })
+    sections = sorted({s["section"] for s in slides})
+    return {
+        "presentation_meta": {
+            "title": "Benchmark Presentation",
+            "subtitle": "Synthetic deck generated by the offline benchmark harness",
+            "total_content_slides": slide_count,
+        },
+        "theme": {"name": "Benchmark", "style": "corporate", "palette_index": 0},
+        "table_of_contents": [
+            {"section_number": i + 1, "section_title": title,
+             "slides": [s["slide_number"] for s in slides if s["section"] == title]}
+            for i, title in enumerate(sections)
+        ],
+        "content_slides": slides,
+    }
+
+
+_PNG_CACHE = {}
+
+
+def deterministic_png(size=1024):
+    """Noise PNG (incompressible, like a real photo) rendered once per size"""
+    if size not in _PNG_CACHE:
+        from PIL import Image
+        rng = random.Random(size)
+        img = Image.frombytes("RGB", (size, size), rng.randbytes(size * size * 3))
+        buf = BytesIO()
+        img.save(buf, format="PNG")
+        _PNG_CACHE[size] = buf.getvalue()
+    return _PNG_CACHE[size]
+
+
+class FakeOpenAIBackend:
+    """httpx handler answering the chat and image endpoints the pipeline uses.
+    Call it for httpx.Client; use `async_handler` for httpx.AsyncClient."""
+
+    def __init__(self, chat_latency, image_latency, stream_chunks=40, token_latency=0.0, truncate_rate=0.0):
+        self.chat_latency = chat_latency
+        self.truncate_rate = truncate_rate
+        self._rng = random.Random(0)
+        self.token_latency = token_latency  # seconds per output token (~4 chars)
+        self.image_latency = image_latency
+        self.stream_chunks = stream_chunks
+        self.calls = {"chat": 0, "image": 0}
+
+    def _route(self, request):
+        """Returns (latency, response or None, stream pieces or None, per-piece delay)"""
+        import httpx
+        path = request.url.path
+        body = json.loads(request.content or b"{}")
+        if path.endswith("/chat/completions"):
+            self.calls["chat"] += 1
+            return self._chat(body)
+        if path.endswith("/images/generations"):
+            self.calls["image"] += 1
+            b64 = base64.b64encode(deterministic_png()).decode()
+            return self.image_latency, httpx.Response(200, json={"created": 0, "data": [{"b64_json": b64}]}), None, 0
+        return 0, httpx.Response(404, json={"error": {"message": f"Fake backend has no {path}"}}), None, 0
+
+    def _chat(self, body):
+        import httpx
+        prompt = body["messages"][-1]["content"]
+        if "Write the content_points for slide" in prompt:
+            # Expansion step of outline planning
+            content = json.dumps({"content_points": [
+                f"Expanded point {i} with enough words to wrap across a realistic text box width"
+                for i in range(1, 5)
+            ]})
+        elif "Write only these missing slides:" in prompt:
+            # Repair step: just the requested slide numbers
+            numbers = [int(n) for n in re.findall(r"\d+", prompt.split("Write only these missing slides:")[1].split(".")[0])]
+            slides = canned_plan(max(numbers))["content_slides"]
+            content = json.dumps({"content_slides": [s for s in slides if s["slide_number"] in numbers]})
+        elif prompt.lstrip().startswith("Condense this excerpt"):
+            # Map step of long-document planning: short bullet notes
+            content = "\n".join(f"- Condensed fact {i} from this part of the document" for i in range(8))
+        else:
+            match = re.search(r"exactly (\d+) content slides", prompt, re.IGNORECASE)
+            slide_count = int(match.group(1)) if match else 5
+            salt = hashlib.sha256(prompt.encode()).hexdigest()[:12]
+            plan = canned_plan(slide_count, salt)
+            if "Only plan the structure now" in prompt:
+                # Outline call of outline planning: no bullets yet
+                for slide in plan["content_slides"]:
+                    slide["summary"] = " ".join(slide.pop("content_points")[:1])
+            content = json.dumps(plan, indent=2)
+            if self.truncate_rate and self._rng.random() < self.truncate_rate:
+                # Simulated cut-off completion: the planner has to repair it
+                self.calls["truncated"] = self.calls.get("truncated", 0) + 1
+                content = content[:int(len(content) * 0.6)]
+
+        latency = self.chat_latency + self.token_latency * len(content) / 4
+        if not body.get("stream"):
+            return latency, httpx.Response(200, json={
+                "id": "chatcmpl-bench", "object": "chat.completion", "created": 0,
+                "model": body.get("model", "gpt-4o"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+            }), None, 0
+
+        step = max(1, len(content) // self.stream_chunks)
+        pieces = []
+        for i in range(0, len(content), step):
+            chunk = {
+                "id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": 0,
+                "model": body.get("model", "gpt-4o"),
+                "choices": [{"index": 0, "delta": {"content": content[i:i + step]}, "finish_reason": None}],
+            }
+            pieces.append(f"data: {json.dumps(chunk)}\n\n".encode())
+        return 0, None, pieces, latency / max(1, len(pieces))
+
+    def __call__(self, request):
+        import httpx
+        latency, response, pieces, delay = self._route(request)
+        time.sleep(latency)
+        if response is not None:
+            return response
+
+        def events():
+            for piece in pieces:
+                time.sleep(delay)
+                yield piece
+            yield b"data: [DONE]\n\n"
+
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=events())
+
+    async def async_handler(self, request):
+        import asyncio
+        import httpx
+        latency, response, pieces, delay = self._route(request)
+        await asyncio.sleep(latency)
+        if response is not None:
+            return response
+
+        async def events():
+            for piece in pieces:
+                await asyncio.sleep(delay)
+                yield piece
+            yield b"data: [DONE]\n\n"
+
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=events())
+
+
+def install_fakes(pipeline, chat_latency, image_latency, upload_latency, token_latency=0.0, truncate_rate=0.0):
+    """Points the pipeline's OpenAI clients and the Cloudinary uploader at the fakes"""
+    import httpx
+    from openai import AsyncOpenAI, OpenAI
+    import cloudinary.uploader
+    from rate_limiter import AsyncRateLimitedTransport, RateLimitedTransport
+
+    backend = FakeOpenAIBackend(chat_latency, image_latency, token_latency=token_latency,
+                                truncate_rate=truncate_rate)
+    pipeline.client = OpenAI(
+        api_key="sk-benchmark",
+        max_retries=0,
+        http_client=httpx.Client(transport=RateLimitedTransport(httpx.MockTransport(backend)))
+    )
+    pipeline.aclient = AsyncOpenAI(
+        api_key="sk-benchmark",
+        max_retries=0,
+        http_client=httpx.AsyncClient(
+            transport=AsyncRateLimitedTransport(httpx.MockTransport(backend.async_handler))
+        )
+    )
+
+    def fake_upload_part(file, http_headers=None, **options):
+        time.sleep(upload_latency)
+        public_id = options.get("public_id") or "ppt/benchmark"
+        return {"public_id": public_id, "secure_url": f"https://benchmark.invalid/{public_id}.pptx"}
+
+    cloudinary.uploader.upload_large_part = fake_upload_part
+    return backend
+
+
+def count_builds():
+    """Counts engine.ProfessionalPPTBuilder.build calls per request thread"""
+    import engine
+
+    builds = threading.local()
+    build = engine.ProfessionalPPTBuilder.build
+
+    def counted_build(self, *args, **kwargs):
+        builds.count = getattr(builds, "count", 0) + 1
+        return build(self, *args, **kwargs)
+
+    engine.ProfessionalPPTBuilder.build = counted_build
+    return builds
+
+
+# ----------- CASES -----------
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return round(ordered[index], 4)
+
+
+def _image_paths_for(plan, workdir):
+    """Real files on disk for every image slide, as the image stage would produce"""
+    path = os.path.join(workdir, "bench_image.png")
+    if not os.path.exists(path):
+        with open(path, "wb") as f:
+            f.write(deterministic_png())
+    return {s["slide_number"]: path for s in plan["content_slides"] if s["has_image"]}
+
+
+def run_case(case):
+    """Runs one (scenario, slides, concurrency) case; executed in a fresh process"""
+    for key, value in DUMMY_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ["PLAN_MODE"] = case["plan_mode"]
+    os.environ["PPT_RENDER_BACKEND"] = case["render_backend"]
+    os.environ["PPT_RENDER_WORKERS"] = str(case["render_workers"])
+    os.environ["PPT_ZIP_LEVEL"] = str(case["zip_level"])
+    workdir = tempfile.mkdtemp(prefix="ppt-bench-")
+    os.chdir(workdir)  # isolates img_cache/ and plan_cache/
+    sys.path.insert(0, case["repo_dir"])
+
+    import contextlib
+    with contextlib.redirect_stdout(open(os.devnull, "w")), contextlib.redirect_stderr(open(os.devnull, "w")):
+        import engine
+        import fullscreen
+        if case["scenario"] == "server":
+            import server
+            pipeline = server.pipeline
+        else:
+            pipeline = fullscreen.pipeline
+        backend = install_fakes(pipeline, case["chat_latency"], case["image_latency"], case["upload_latency"],
+                                case["token_latency"], case["truncate_rate"])
+
+        def unique_summary(i):
+            # Unique summary per request: no plan or image cache hits
+            words = max(40, case["doc_words"])
+            return f"Benchmark request {i} {case['slides']} " + "lorem ipsum dolor sit amet. " * (words // 5)
+
+        deck_sizes = []
+        build_counts = []
+        if case["scenario"] == "pipeline":
+            def one(i):
+                fullscreen.generate_presentation(case["slides"], unique_summary(i), use_cache=False)
+        elif case["scenario"] == "pipeline-asyncio":
+            def one(i):
+                fullscreen.event_loop.run(fullscreen.agenerate_presentation(
+                    case["slides"], unique_summary(i), use_cache=False
+                ))
+        elif case["scenario"] == "server":
+            builds = count_builds()
+
+            def one(i):
+                builds.count = 0
+                server.generate_presentation(case["slides"], unique_summary(i))
+                build_counts.append(builds.count)
+                if builds.count != 1:
+                    raise AssertionError(f"server.py built the deck {builds.count} times for one request")
+        elif case["scenario"] == "build":
+            plan = canned_plan(case["slides"])
+            image_paths = _image_paths_for(plan, workdir)
+
+            def one(i):
+                deck = pipeline.builder.build(
+                    dict(plan["presentation_meta"]), dict(plan["theme"]),
+                    plan["table_of_contents"], plan["content_slides"], image_paths
+                )
+                deck_sizes.append(deck.getbuffer().nbytes)
+        else:
+            raise ValueError(f"Unknown scenario: {case['scenario']}")
+
+        one(-1)  # warm-up: imports, template parsing, first connections
+
+        latencies = []
+        errors = 0
+
+        def timed(i):
+            start = time.perf_counter()
+            one(i)
+            return time.perf_counter() - start
+
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=case["concurrency"]) as executor:
+            futures = [executor.submit(timed, i) for i in range(case["requests"])]
+            for future in futures:
+                try:
+                    latencies.append(future.result())
+                except Exception:
+                    errors += 1
+        wall = time.perf_counter() - wall_start
+        # The case runs in a pool process, which joins its own children on exit
+        engine.shutdown_render_pool()
+
+    return {
+        "scenario": case["scenario"],
+        "slides": case["slides"],
+        "concurrency": case["concurrency"],
+        "requests": case["requests"],
+        "errors": errors,
+        "wall_seconds": round(wall, 4),
+        "throughput_per_second": round(len(latencies) / wall, 4) if wall else None,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1),
+        "deck_bytes": max(deck_sizes) if deck_sizes else None,
+        "builds_per_request": max(build_counts) if build_counts else None,
+        "fake_calls": dict(backend.calls),
+    }
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline PPT pipeline benchmark")
+    parser.add_argument("--scenarios", default="pipeline,build",
+                        help="comma-separated: pipeline (generate_presentation), pipeline-asyncio "
+                             "(agenerate_presentation), build (builder only), server (server.py's "
+                             "generate_presentation; fails if it builds a deck more than once)")
+    parser.add_argument("--slides", type=_int_list, default=[1, 5, 10, 20])
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 4])
+    parser.add_argument("--requests", type=int, default=8, help="decks per case")
+    parser.add_argument("--doc-words", type=int, default=200,
+                        help="summary length in words (large values exercise map-reduce planning)")
+    parser.add_argument("--chat-latency", type=float, default=0.5, help="seconds per fake plan completion")
+    parser.add_argument("--token-latency", type=float, default=0.0,
+                        help="extra fake chat seconds per output token (0.01 ~ 100 tokens/s)")
+    parser.add_argument("--plan-mode", default="single", choices=("single", "outline"),
+                        help="PLAN_MODE for the planner")
+    parser.add_argument("--render-backend", default="ooxml", choices=("ooxml", "pptx"),
+                        help="PPT_RENDER_BACKEND for the builder")
+    parser.add_argument("--render-workers", type=int, default=0,
+                        help="PPT_RENDER_WORKERS: processes rendering content slides (0 = in-process)")
+    parser.add_argument("--zip-level", type=int, default=6,
+                        help="PPT_ZIP_LEVEL: deflate level for the deck's XML parts")
+    parser.add_argument("--truncate-rate", type=float, default=0.0,
+                        help="fraction of plan completions the fake cuts off (exercises plan repair)")
+    parser.add_argument("--image-latency", type=float, default=1.0, help="seconds per fake image")
+    parser.add_argument("--upload-latency", type=float, default=0.1, help="seconds per fake upload chunk")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    cases = [
+        {
+            "scenario": scenario, "slides": slides, "concurrency": concurrency,
+            "requests": args.requests, "doc_words": args.doc_words, "chat_latency": args.chat_latency,
+            "token_latency": args.token_latency, "plan_mode": args.plan_mode,
+            "render_backend": args.render_backend, "render_workers": args.render_workers,
+            "zip_level": args.zip_level,
+            "truncate_rate": args.truncate_rate,
+            "image_latency": args.image_latency, "upload_latency": args.upload_latency,
+            "repo_dir": repo_dir,
+        }
+        for scenario in args.scenarios.split(",")
+        for slides in args.slides
+        for concurrency in args.concurrency
+    ]
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for case in cases:
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            result = pool.submit(run_case, case).result()
+        results.append(result)
+        print(f"⏱️ {result['scenario']:8} slides={result['slides']:<3} conc={result['concurrency']:<3} "
+              f"p50={result['latency_p50']}s p95={result['latency_p95']}s "
+              f"thr={result['throughput_per_second']}/s rss={result['peak_rss_mb']}MB",
+              file=sys.stderr)
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "settings": {k: v for k, v in vars(args).items() if k != "output"},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    # Regression gate for the server scenario: one build per request
+    rebuilt = [r for r in results if r["builds_per_request"] not in (None, 1)]
+    for result in rebuilt:
+        print(f"❌ {result['scenario']} slides={result['slides']}: built {result['builds_per_request']} decks "
+              f"per request", file=sys.stderr)
+    return 1 if rebuilt else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
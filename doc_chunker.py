@@ -0,0 +1,55 @@
+import re
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # optional: fall back to the ~4 characters per token rule of thumb
+    _encoding = None
+
+CHARS_PER_TOKEN = 4
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text):
+    """Token count for text (exact with tiktoken installed, estimated otherwise)"""
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _pieces(text, max_tokens):
+    """Paragraphs, with oversized ones split into sentences and then hard-cut"""
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            yield paragraph
+            continue
+        for sentence in _SENTENCE_END.split(paragraph):
+            if estimate_tokens(sentence) <= max_tokens:
+                yield sentence
+                continue
+            step = max_tokens * CHARS_PER_TOKEN
+            for i in range(0, len(sentence), step):
+                yield sentence[i:i + step]
+
+
+def split_into_chunks(text, max_tokens):
+    """Splits text into consecutive chunks of at most ~max_tokens each,
+    breaking at paragraph, then sentence boundaries where possible."""
+    chunks = []
+    current = []
+    current_tokens = 0
+    for piece in _pieces(text, max_tokens):
+        piece_tokens = estimate_tokens(piece)
+        if current and current_tokens + piece_tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += piece_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
@@ -0,0 +1,28 @@
+"""The presentation engine shared by every entry point.
+
+    from engine import Pipeline
+
+    pipeline = Pipeline()              # once per process
+    url = pipeline.generate(8, summary)
+
+palettes (PROFESSIONAL_PALETTES), planner (EnhancedSlidePlanner and the
+per-process plan cache), images (the image backends), builder
+(ProfessionalPPTBuilder, its compiled templates and render pool) and
+pipeline (Pipeline, which wires them to a storage backend). Caching,
+pooling and metrics added here apply to fullscreen.py, git.py,
+Destruction.py, enhancement.py, final.py and server.py alike.
+"""
+from .builder import (
+    ProfessionalPPTBuilder, compile_templates, compiled_presentation, new_presentation, render_content_slide,
+    shutdown_render_pool
+)
+from .images import IMAGE_BACKENDS, AsyncImageGenerator, ImageGenerator
+from .palettes import PROFESSIONAL_PALETTES
+from .pipeline import Pipeline, configure_services
+from .planner import EnhancedSlidePlanner, plan_cache
+
+__all__ = [
+    "AsyncImageGenerator", "EnhancedSlidePlanner", "IMAGE_BACKENDS", "ImageGenerator", "PROFESSIONAL_PALETTES",
+    "Pipeline", "ProfessionalPPTBuilder", "compile_templates", "compiled_presentation", "configure_services",
+    "new_presentation", "plan_cache", "render_content_slide", "shutdown_render_pool",
+]
@@ -0,0 +1,945 @@
+import multiprocessing
+import os
+import random
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from pptx import Presentation
+from pptx.dml.color import RGBColor
+from pptx.enum.shapes import MSO_SHAPE
+from pptx.enum.text import MSO_ANCHOR, PP_ALIGN
+from pptx.util import Inches, Pt
+
+from image_postprocess import prepare_for_frame
+from metrics import FALLBACKS, timed_stage
+from ooxml_writer import SlideWriter
+from package_writer import write_package
+
+from .palettes import PROFESSIONAL_PALETTES, hex_to_rgb
+
+# "ooxml" renders slides with ooxml_writer's templates, "pptx" through python-pptx (same output)
+PPT_RENDER_BACKEND = os.getenv("PPT_RENDER_BACKEND", "ooxml").lower()
+# With the ooxml backend, decks of at least PPT_RENDER_MIN_SLIDES content slides are
+# rendered in a pool of PPT_RENDER_WORKERS processes (0 = always in-process)
+PPT_RENDER_WORKERS = int(os.getenv("PPT_RENDER_WORKERS", "0"))
+PPT_RENDER_MIN_SLIDES = int(os.getenv("PPT_RENDER_MIN_SLIDES", "8"))
+
+_template_bytes = None
+
+
+def new_presentation():
+    """Blank Presentation from python-pptx's default template, kept in memory.
+
+    Presentation() would re-read the template from disk for every deck; the
+    bytes are loaded once (in the gunicorn master when preloading, so every
+    worker shares them) and each deck parses its own copy.
+    """
+    global _template_bytes
+    if _template_bytes is None:
+        from pptx.api import _default_pptx_path
+        with open(_default_pptx_path(), "rb") as f:
+            _template_bytes = f.read()
+    return Presentation(BytesIO(_template_bytes))
+
+
+_compiled_templates = {}
+_compiled_templates_lock = threading.Lock()
+
+
+def compiled_presentation(palette_index):
+    """Presentation for a deck in PROFESSIONAL_PALETTES[palette_index], sized
+    16:9 and with the corporate master/layout styles already applied.
+
+    Styling walks every layout placeholder; it is done once per palette and
+    the styled package kept as bytes, so each deck only parses a copy.
+    """
+    template = _compiled_templates.get(palette_index)
+    if template is None:
+        with _compiled_templates_lock:
+            template = _compiled_templates.get(palette_index)
+            if template is None:
+                prs = new_presentation()
+                prs.slide_width = Inches(10.0)
+                prs.slide_height = Inches(5.625)
+                ProfessionalPPTBuilder()._apply_corporate_design(prs, {"palette_index": palette_index})
+                out = BytesIO()
+                prs.save(out)
+                template = _compiled_templates[palette_index] = out.getvalue()
+    return Presentation(BytesIO(template))
+
+
+def compile_templates():
+    """Pre-builds compiled_presentation() for every palette (e.g. at startup)"""
+    for palette_index in range(len(PROFESSIONAL_PALETTES)):
+        compiled_presentation(palette_index)
+
+
+def optimize_layout(slide, content_type):  
+    # Clears default placeholders, sets smart margins  
+    for shape in slide.shapes:  
+        if shape.is_placeholder:  
+            shape.element.getparent().remove(shape.element)  
+
+    # Content-aware positioning (title vs. bullet vs. image)  
+    return {  
+        'title': {'top': 0.5, 'left': 1.0},  
+        'bullet': {'top': 2.0, 'left': 1.5},  
+        'image': {'top': 1.5, 'left': 5.0}  
+    }[content_type]  
+
+
+def set_auto_text_color(shape, bg_color):
+    """Automatically sets black or white text based on background brightness"""
+    try:
+        rgb = hex_to_rgb(bg_color)
+        brightness = (rgb[0]*299 + rgb[1]*587 + rgb[2]*114) / 1000
+        shape.text_frame.paragraphs[0].font.color.rgb = (
+            RGBColor(0, 0, 0) if brightness > 128 
+            else RGBColor(255, 255, 255))
+    except Exception as e:
+        print(f"⚠️ Text color error: {e}")
+        # Fallback to black text
+        shape.text_frame.paragraphs[0].font.color.rgb = RGBColor(0, 0, 0)
+
+
+def add_auto_cropped_image(slide, img_path, x, y, w, h):  
+    img = slide.shapes.add_picture(img_path, x, y, w, h)  
+    img.crop_left = img.crop_right = 0.1  # 10% auto-crop  
+    img.crop_top = img.crop_bottom = 0.1  
+
+
+
+def get_safe_font():
+    """Returns available fonts in priority order"""
+    for font in ["Calibri", "Arial", "Helvetica", "Segoe UI"]:
+        if font in Presentation().font_manager:
+            return font
+    return "Calibri"
+
+
+
+
+def add_random_design_element(slide, theme):
+    """Adds random design elements with contrasting colors to slides"""
+    palette = PROFESSIONAL_PALETTES[theme.get("palette_index", random.randint(0, len(PROFESSIONAL_PALETTES)-1))]
+    
+    # Available shapes (MSO_SHAPE enum values)
+    shapes = [
+        MSO_SHAPE.RECTANGLE,
+        MSO_SHAPE.ROUNDED_RECTANGLE,
+        MSO_SHAPE.OVAL,
+        MSO_SHAPE.DIAMOND,
+        MSO_SHAPE.CHEVRON,
+        MSO_SHAPE.PENTAGON,
+        MSO_SHAPE.PLAQUE
+    ]
+    
+    # Choose random properties
+    shape_type = random.choice(shapes)
+    rotation = random.randint(-45, 45)
+    width = Inches(random.uniform(0.5, 3))
+    height = Inches(random.uniform(0.1, 0.5))
+    x_pos = Inches(random.uniform(-1, 10))
+    y_pos = Inches(random.uniform(0, 7))
+    
+    # Choose contrasting color
+    color_choices = [palette["accent"], palette["secondary"]]
+    if random.random() > 0.7:
+        color_choices.append(palette["text"])
+    fill_color = random.choice(color_choices)
+    
+    # Create the shape
+    shape = slide.shapes.add_shape(
+        shape_type,
+        x_pos, y_pos,
+        width, height
+    )
+    
+    # Apply styling
+    shape.rotation = rotation
+    shape.fill.solid()
+    shape.fill.fore_color.rgb = RGBColor(*hex_to_rgb(fill_color))
+    shape.fill.transparency = random.uniform(0.2, 0.6)
+    shape.line.fill.background()  # No border
+    
+    # Correct shadow implementation
+    if random.random() > 0.5:
+        shadow = shape.shadow
+        shadow.inherit = False
+        shadow.visible = True
+        shadow.blur_radius = Pt(5)
+        shadow.offset_x = Pt(2)
+        shadow.offset_y = Pt(2)
+        # Set color through foreground color
+        shadow.fore_color.rgb = RGBColor(0, 0, 0)
+        shadow.transparency = 0.5
+
+
+
+
+def add_premium_design_elements(slide, theme):
+    """Adds professional design elements with precise placement"""
+    palette = PROFESSIONAL_PALETTES[theme.get("palette_index", random.randint(0, len(PROFESSIONAL_PALETTES)-1))]
+    
+    # Main diagonal accent strip (perfectly aligned from corner to corner)
+    create_professional_shape(
+        slide, MSO_SHAPE.RECTANGLE,
+        Inches(-2), Inches(0),  # Starts above top-left corner
+        Inches(12), Inches(0.8),  # Long enough to cross entire slide
+        palette["accent"], transparency=0.15,
+        rotation=-20  # Gentle angle
+    )
+    
+    # Secondary elements (precisely placed)
+    elements = [
+        # (x, y, width, height, rotation, color_key, transparency)
+        (8.5, 0.5, 1.5, 0.3, 15, "secondary", 0.2),  # Top-right
+        (0.5, 5.5, 2.0, 0.4, -15, "primary", 0.25),   # Bottom-left
+        (6.0, 6.0, 1.0, 0.2, 0, "accent", 0.3)       # Bottom-center
+    ]
+    
+    for x, y, w, h, rot, color_key, trans in elements:
+        create_professional_shape(
+            slide, MSO_SHAPE.ROUNDED_RECTANGLE,
+            Inches(x), Inches(y),
+            Inches(w), Inches(h),
+            palette[color_key], transparency=trans, rotation=rot
+        )
+
+
+
+
+
+def add_safe_shadow(shape):
+    """Bulletproof shadow implementation"""
+    try:
+        if not hasattr(shape, 'shadow'):
+            return
+            
+        shadow = shape.shadow
+        shadow.inherit = False
+        shadow.visible = True
+        shadow.blur_radius = Pt(4)
+        shadow.offset_x = Pt(1)
+        shadow.offset_y = Pt(1)
+        
+        # Universal color setting approach
+        try:
+            shadow._element.get_or_add_effectClr().srgbClr.val = '1F1F1F'  # Hex for dark gray
+        except:
+            try:
+                if hasattr(shadow, 'color'):
+                    shadow.color.rgb = RGBColor(31, 31, 31)
+                elif hasattr(shadow.fill, 'fore_color'):
+                    shadow.fill.solid()
+                    shadow.fill.fore_color.rgb = RGBColor(31, 31, 31)
+            except:
+                pass
+                
+        shadow.transparency = 0.6
+    except Exception as e:
+        print(f"⚠️ Shadow formatting skipped: {str(e)}")
+
+
+def add_professional_gradient(slide, start_color, end_color, direction="vertical"):
+    if isinstance(slide, SlideWriter):
+        try:
+            angle = {"diagonal": 45, "horizontal": 0}.get(direction, 90)
+            slide.set_gradient_background(RGBColor(*hex_to_rgb(start_color)), RGBColor(*hex_to_rgb(end_color)), angle)
+        except Exception:
+            pass
+        return
+    try:
+        bg_fill = slide.background.fill
+        bg_fill.gradient()
+        bg_fill.gradient_stops[0].color.rgb = RGBColor(*hex_to_rgb(start_color))
+        bg_fill.gradient_stops[1].color.rgb = RGBColor(*hex_to_rgb(end_color))
+        if direction == "diagonal":
+            bg_fill.gradient_angle = 45
+        elif direction == "horizontal":
+            bg_fill.gradient_angle = 0
+        else:
+            bg_fill.gradient_angle = 90
+    except Exception:
+        try:
+            bg_fill = slide.background.fill
+            bg_fill.solid()
+            bg_fill.fore_color.rgb = RGBColor(*hex_to_rgb(start_color))
+        except:
+            pass
+
+# def create_professional_text_box(slide, x, y, width, height, text, theme,
+#                                font_size=18, font_name="Calibri", alignment=PP_ALIGN.LEFT,
+#                                bold=False, text_color_key="text"):
+#     text_box = slide.shapes.add_textbox(x, y, width, height)
+#     tf = text_box.text_frame
+#     tf.clear()
+#     tf.word_wrap = True
+#     tf.auto_size = None
+#     tf.vertical_anchor = MSO_ANCHOR.TOP
+#     tf.margin_bottom = Pt(8)
+#     tf.margin_top = Pt(8)
+#     tf.margin_left = Pt(16)
+#     tf.margin_right = Pt(16)
+    
+#     p = tf.paragraphs[0]
+#     p.text = text
+#     p.font.size = Pt(font_size)
+#     p.font.name = font_name
+#     p.font.bold = bold
+#     p.alignment = alignment
+#     p.space_after = Pt(15)
+#     p.line_spacing = 1.3
+    
+#     # Color handling (updated)
+#     if text_color_key == "auto":
+#         # Get background color (assuming gradient start as bg)
+#         bg_color = theme.get("gradient_start", "#FFFFFF")  
+#         p.font.color.rgb = get_contrast_color(bg_color)
+#     else:
+#         p.font.color.rgb = RGBColor(*hex_to_rgb(theme.get(text_color_key, "#000000")))
+    
+#     return text_box
+
+# Add this helper function
+def get_contrast_color(bg_color):
+    """Returns black or white depending on background brightness"""
+    rgb = hex_to_rgb(bg_color)
+    brightness = (rgb[0]*299 + rgb[1]*587 + rgb[2]*114) / 1000
+    return RGBColor(0, 0, 0) if brightness > 128 else RGBColor(255, 255, 255)
+
+
+
+
+def create_professional_shape(slide, shape_type, x, y, width, height, fill_color, transparency=0, rotation=0):
+    # python-pptx 0.6 has no fill transparency: the attribute is accepted but not
+    # written, and SlideWriter leaves it out too so both backends match
+    if isinstance(slide, SlideWriter):
+        return slide.add_shape(shape_type, x, y, width, height, RGBColor(*hex_to_rgb(fill_color)), rotation)
+    shape = slide.shapes.add_shape(shape_type, x, y, width, height)
+    if rotation:
+        shape.rotation = rotation
+    shape.fill.solid()
+    shape.fill.fore_color.rgb = RGBColor(*hex_to_rgb(fill_color))
+    if transparency > 0:
+        shape.fill.transparency = transparency
+    shape.line.fill.background()
+    return shape
+
+
+class ProfessionalPPTBuilder:
+    def __init__(self, backend=None):
+        # Initialize default styling parameters
+        self.default_title_size = Pt(44)
+        self.default_subtitle_size = Pt(24)
+        self.default_font = 'Calibri'
+        self.backend = backend or PPT_RENDER_BACKEND
+
+    def _canvas(self, slide):
+        """What the layout methods draw on: a SlideWriter for the ooxml backend"""
+        return SlideWriter(slide) if self.backend == "ooxml" else slide
+
+    def _finish(self, canvas):
+        if isinstance(canvas, SlideWriter):
+            canvas.flush()
+
+
+    def create_professional_text_box(self, slide, x, y, width, height, text, theme,
+                              font_size=18, font_name="Calibri", alignment=PP_ALIGN.LEFT,
+                              bold=False, text_color_key="text"):
+        if isinstance(slide, SlideWriter):
+            return slide.add_textbox(x, y, width, height, text, Pt(font_size), font_name, alignment, bold,
+                                     self._text_color(theme, text_color_key))
+        text_box = slide.shapes.add_textbox(x, y, width, height)
+        tf = text_box.text_frame
+        tf.clear()
+        tf.word_wrap = True
+        tf.auto_size = None
+        tf.vertical_anchor = MSO_ANCHOR.TOP
+        tf.margin_bottom = Pt(8)
+        tf.margin_top = Pt(8)
+        tf.margin_left = Pt(16)
+        tf.margin_right = Pt(16)
+        
+        p = tf.paragraphs[0]
+        p.text = text
+        p.font.size = Pt(font_size)
+        p.font.name = font_name
+        p.font.bold = bold
+        p.alignment = alignment
+        p.space_after = Pt(15)
+        p.line_spacing = 1.3
+        p.font.color.rgb = self._text_color(theme, text_color_key)
+        return text_box
+
+    def _text_color(self, theme, text_color_key):
+        # Handle color assignment safely
+        try:
+            if isinstance(theme, dict):  # If theme is a palette dictionary
+                if text_color_key == "auto":
+                    bg_color = theme.get("gradient_start", "#FFFFFF")
+                    return self.get_contrast_color(bg_color)
+                color_hex = theme.get(text_color_key, "#000000")
+                return RGBColor(*hex_to_rgb(color_hex))
+            if not isinstance(theme, RGBColor):  # If theme is already an RGBColor
+                raise ValueError(f"not a color: {theme!r}")
+            return theme
+        except Exception as e:
+            print(f"⚠️ Color assignment error: {e}")
+            return RGBColor(0, 0, 0)  # Fallback to black
+
+
+    def get_contrast_color(self, bg_color):
+        """Returns black or white depending on background brightness"""
+        rgb = hex_to_rgb(bg_color)
+        brightness = (rgb[0]*299 + rgb[1]*587 + rgb[2]*114) / 1000
+        return RGBColor(0, 0, 0) if brightness > 128 else RGBColor(255, 255, 255)
+
+    def create_professional_shape(self, slide, shape_type, x, y, width, height, fill_color, transparency=0):
+        if isinstance(slide, SlideWriter):
+            return slide.add_shape(shape_type, x, y, width, height, RGBColor(*hex_to_rgb(fill_color)))
+        shape = slide.shapes.add_shape(shape_type, x, y, width, height)
+        shape.fill.solid()
+        shape.fill.fore_color.rgb = RGBColor(*hex_to_rgb(fill_color))
+        if transparency > 0:
+            shape.fill.transparency = transparency
+        shape.line.fill.background()
+        return shape
+
+
+    def _create_boxed_text_layout(self, slide, slide_data, palette):
+        """Creates text content in colored boxes (without title)"""
+        points = slide_data.get("content_points", ["Point 1", "Point 2", "Point 3"])
+        if not points:  # Ensure we always have content
+            points = ["Key content not specified"]
+        
+        # Box colors from palette
+        box_colors = [palette["primary"], palette["secondary"], palette["accent"]]
+        
+        # Create boxes in 2x2 grid (starting lower since title exists)
+        for i, point in enumerate(points[:4]):  # Max 4 boxes
+            row = i // 2
+            col = i % 2
+            left = Inches(0.8 + col * 4.5)
+            top = Inches(2.5 + row * 2)  # Adjusted to start below title
+            
+            # Create rounded box
+            box = self.create_professional_shape(
+                slide, MSO_SHAPE.ROUNDED_RECTANGLE,
+                left, top, Inches(4), Inches(1.8),
+                box_colors[i % len(box_colors)],
+                transparency=0.2
+            )
+            
+            # Add text with automatic contrast
+            bg_color = box_colors[i % len(box_colors)]
+            text_color = self.get_contrast_color(bg_color)
+            self.create_professional_text_box(
+                slide, left + Inches(0.3), top + Inches(0.3),
+                Inches(3.4), Inches(1.2), point,
+                text_color, font_size=16
+            )
+
+
+
+
+
+
+
+    def _apply_corporate_design(self, prs, theme):
+        """Internal method to set master slide styles"""
+        try:
+            # Get color palette
+            palette = PROFESSIONAL_PALETTES[theme.get("palette_index", 0)]
+            
+            # Set master background
+            background = prs.slide_master.background
+            background.fill.solid()
+            background.fill.fore_color.rgb = RGBColor(*hex_to_rgb(palette["gradient_start"]))
+            
+            # Set default text styles through placeholders
+            for layout in prs.slide_master.slide_layouts:
+                try:
+                    placeholders = layout.placeholders
+                    
+                    # Title placeholder (usually index 0)
+                    if len(placeholders) > 0:
+                        title = placeholders[0]
+                        if hasattr(title, 'text_frame'):
+                            title.text_frame.paragraphs[0].font.name = self.default_font
+                            title.text_frame.paragraphs[0].font.size = Pt(36)
+                            title.text_frame.paragraphs[0].font.color.rgb = RGBColor(*hex_to_rgb(palette["text"]))
+                    
+                    # Body placeholder (usually index 1)
+                    if len(placeholders) > 1:
+                        body = placeholders[1]
+                        if hasattr(body, 'text_frame'):
+                            for paragraph in body.text_frame.paragraphs:
+                                paragraph.font.name = self.default_font
+                                paragraph.font.size = Pt(18)
+                                paragraph.font.color.rgb = RGBColor(*hex_to_rgb(palette["text_dark"]))
+                except Exception as e:
+                    print(f"⚠️ Layout styling error: {e}")
+                    continue
+                    
+        except Exception as e:
+            print(f"⚠️ Design template error: {e}")
+
+
+    
+    def create_title_slide(self, prs, presentation_meta, theme):
+        """Creates a professional title slide with perfect spacing and responsive design"""
+        slide = self._canvas(prs.slides.add_slide(prs.slide_layouts[6]))
+        palette = PROFESSIONAL_PALETTES[theme.get("palette_index", random.randint(0, len(PROFESSIONAL_PALETTES)-1))]
+        
+        # 1. Background Design
+        add_professional_gradient(slide, palette["gradient_start"], palette["gradient_end"], "diagonal")
+        
+        # Add premium design elements (behind text)
+        self.add_premium_title_elements(slide, palette)
+
+        # 2. Dynamic Title Configuration
+        title_text = presentation_meta.get("title", "Professional Presentation")
+        title_font_size = self.calculate_optimal_font_size(title_text, max_chars=50)
+        
+        self.create_professional_text_box(
+            slide, 
+            Inches(0.5), Inches(1.8),  # Position (left, top)
+            Inches(9), Inches(1.8),     # Dimensions (width, height)
+            title_text,
+            palette,
+            font_size=title_font_size,
+            alignment=PP_ALIGN.CENTER,
+            bold=True,
+            text_color_key="text"
+        )
+
+        # 3. Smart Subtitle Handling
+        subtitle_text = presentation_meta.get("subtitle", "Comprehensive Analysis")
+        subtitle_lines = self.split_text_to_lines(subtitle_text, max_line_length=60)
+        
+        self.create_professional_text_box(
+            slide,
+            Inches(0.5), Inches(4.0),  # Positioned lower than title
+            Inches(9), Inches(len(subtitle_lines) * 0.6),  # Dynamic height
+            '\n'.join(subtitle_lines),
+            palette,
+            font_size=20,
+            alignment=PP_ALIGN.CENTER,
+            text_color_key="text"
+        )
+
+        # 4. Decorative Elements
+        self.add_title_slide_decoration(slide, palette)
+        self._finish(slide)
+
+
+    def add_premium_title_elements(self, slide, palette):
+        """Adds design elements specifically for title slide"""
+        # Diagonal accent strip
+        create_professional_shape(
+            slide, MSO_SHAPE.RECTANGLE,
+            Inches(-2), Inches(1),
+            Inches(12), Inches(0.6),
+            palette["accent"], transparency=0.2, rotation=-20
+        )
+
+        # Corner elements
+        for x, y, w, h, rot in [(8.5, 0.5, 1.5, 0.3, 15), (0.5, 6.5, 2.0, 0.4, -15)]:
+            create_professional_shape(
+                slide, MSO_SHAPE.ROUNDED_RECTANGLE,
+                Inches(x), Inches(y), Inches(w), Inches(h),
+                palette["secondary"], transparency=0.25, rotation=rot
+            )
+
+
+    def add_title_slide_decoration(self, slide, palette):
+        """Adds decorative elements to title slide"""
+        # Thin center line
+        create_professional_shape(
+            slide,
+            random.choice([MSO_SHAPE.ROUNDED_RECTANGLE, MSO_SHAPE.OVAL]),
+            Inches(2.5), Inches(5.5),
+            Inches(5), Inches(0.05),
+            palette["primary"]
+        )
+        
+        # Slide number placeholder (even on title slide for consistency)
+        create_professional_shape(
+            slide,
+            MSO_SHAPE.ROUNDED_RECTANGLE,
+            Inches(8.8), Inches(6.8),
+            Inches(0.8), Inches(0.4),
+            palette["accent"]
+        )
+
+
+    def calculate_optimal_font_size(self, text, max_chars):
+        """Dynamically adjusts font size based on text length"""
+        length = len(text)
+        if length <= 30: return 44
+        if length <= 50: return 38
+        if length <= 70: return 32
+        return 28
+
+
+    def split_text_to_lines(self, text, max_line_length=60):
+        """Smart text splitting for subtitles"""
+        words = text.split()
+        lines = []
+        current_line = []
+        
+        for word in words:
+            if len(' '.join(current_line + [word])) <= max_line_length:
+                current_line.append(word)
+            else:
+                lines.append(' '.join(current_line))
+                current_line = [word]
+        
+        if current_line:
+            lines.append(' '.join(current_line))
+            
+        return lines                
+
+
+
+
+    def create_toc_slide(self, prs, toc_data, theme):
+        slide = self._canvas(prs.slides.add_slide(prs.slide_layouts[6]))
+        palette = PROFESSIONAL_PALETTES[theme.get("palette_index", random.randint(0, len(PROFESSIONAL_PALETTES)-1))]
+        add_professional_gradient(slide, palette["gradient_start"], palette["gradient_end"])
+        self.create_professional_text_box(
+            slide, Inches(1), Inches(0.8), Inches(8), Inches(1),
+            "Table of Contents", palette, font_size=36, alignment=PP_ALIGN.CENTER,
+            bold=True, text_color_key="text"
+        )
+        create_professional_shape(
+            slide, MSO_SHAPE.RECTANGLE,
+            Inches(3), Inches(1.9), Inches(4), Inches(0.05),
+            palette["accent"]
+        )
+        y_start = 2.5
+        for i, section in enumerate(toc_data):
+            section_num = section.get("section_number", i + 1)
+            section_title = section.get("section_title", f"Section {section_num}")
+            slides_range = section.get("slides", [])
+            slide_range_text = f"Slides {slides_range[0]}-{slides_range[-1]}" if slides_range else f"Slide {section_num}"
+            create_professional_shape(
+                slide, MSO_SHAPE.OVAL,
+                Inches(1.5), Inches(y_start + i * 0.8), Inches(0.6), Inches(0.6),
+                palette["accent"]
+            )
+            self.create_professional_text_box(
+                slide, Inches(1.5), Inches(y_start + i * 0.8), Inches(0.6), Inches(0.6),
+                str(section_num), {"text": palette["text"]}, font_size=20,
+                alignment=PP_ALIGN.CENTER, bold=True, text_color_key="text"
+            )
+            self.create_professional_text_box(
+                slide, Inches(2.5), Inches(y_start + i * 0.8), Inches(5.5), Inches(0.6),
+                section_title, palette, font_size=18, bold=True, text_color_key="text"
+            )
+            self.create_professional_text_box(
+                slide, Inches(8.2), Inches(y_start + i * 0.8), Inches(1.5), Inches(0.6),
+                slide_range_text, palette, font_size=14, alignment=PP_ALIGN.RIGHT,
+                text_color_key="text"
+            )
+        self._finish(slide)
+
+
+    def create_content_slide(self, slide, slide_data, image_path, theme, slide_number):
+        palette = PROFESSIONAL_PALETTES[theme.get("palette_index", random.randint(0, len(PROFESSIONAL_PALETTES)-1))]
+        add_professional_gradient(slide, palette["gradient_start"], palette["gradient_end"])
+        
+        # Add premium design elements (before content)
+        add_premium_design_elements(slide, theme)
+        
+        # Slide number indicator
+        create_professional_shape(
+            slide, MSO_SHAPE.ROUNDED_RECTANGLE,
+            Inches(9), Inches(0.2), Inches(0.8), Inches(0.4),
+            palette["accent"]
+        )
+        self.create_professional_text_box(
+            slide, Inches(9), Inches(0.2), Inches(0.8), Inches(0.4),
+            str(slide_number), {"text": palette["text"]}, font_size=16,
+            alignment=PP_ALIGN.CENTER, bold=True, text_color_key="text"
+        )
+
+        # Add title (only once, here in the main method)
+        self.create_professional_text_box(
+            slide, Inches(9), Inches(0.2), Inches(0.8), Inches(0.4),
+            str(slide_number), {"text": palette["text"]}, font_size=16,
+            alignment=PP_ALIGN.CENTER, bold=True, text_color_key="text"
+        )
+
+        # Add title with tighter line spacing
+        title_box = self.create_professional_text_box(
+            slide, Inches(0.8), Inches(0.5), Inches(8), Inches(1),
+            slide_data.get("title", "Untitled Slide"), palette,
+            font_size=28, bold=True, text_color_key="text"
+        )
+        
+        # Add underline below title
+        # create_professional_shape(
+        #     slide, MSO_SHAPE.RECTANGLE,
+        #     Inches(0.8), Inches(1.4), Inches(3), Inches(0.05),
+        #     palette["accent"]
+        # )
+
+        # Handle content
+        content_points = slide_data.get("content_points", ["Key points not specified"])
+        if not content_points:  # Double-check empty list
+            content_points = ["Important content goes here"]
+
+        # Image handling
+        has_image = (slide_data.get("has_image", False) and 
+                    image_path and 
+                    os.path.exists(image_path))
+        
+        if has_image:
+            try:
+                # Add image (right side), downscaled and recompressed for its frame
+                add_picture = slide.add_picture if isinstance(slide, SlideWriter) else slide.shapes.add_picture
+                img = add_picture(
+                    prepare_for_frame(image_path, Inches(3.5), Inches(3.5)),
+                    Inches(5.5), Inches(1.8),  # x, y (below title)
+                    Inches(3.5), Inches(3.5)    # width, height
+                )
+                
+                # Add bullet points (left side)
+                y_pos = 2.0  # Start position below title
+                for point in content_points[:4]:  # Max 4 points
+                    # Bullet marker
+                    create_professional_shape(
+                        slide, MSO_SHAPE.OVAL,
+                        Inches(0.8), Inches(y_pos), Inches(0.15), Inches(0.15),
+                        palette["accent"]
+                    )
+                    # Bullet text
+                    self.create_professional_text_box(
+                        slide, Inches(1.1), Inches(y_pos-0.08), 
+                        Inches(4), Inches(0.5), point,
+                        palette, font_size=14, text_color_key="text"
+                    )
+                    y_pos += 0.7  # Spacing between points
+                    
+            except Exception as e:
+                print(f"⚠️ Image load failed, using text layout: {str(e)}")
+                FALLBACKS.inc(kind="image_layout")
+                self._create_text_slide_layout(slide, slide_data, palette)
+        else:
+            # Text-only slide layouts
+            if random.random() < 0.3:
+                self._create_boxed_text_layout(slide, slide_data, palette)
+            else:
+                self._create_text_slide_layout(slide, slide_data, palette)
+
+    def _create_boxed_text_layout(self, slide, slide_data, palette):
+        """Creates content in colored boxes with corrected dimensions"""
+        points = slide_data.get("content_points", ["Point 1", "Point 2", "Point 3", "Point 4"])
+        if not points:
+             points = ["Key content not specified"]
+
+        # Box colors from palette
+        box_colors = [palette["primary"], palette["secondary"], palette["accent"], palette["secondary"]]
+
+        # Define grid properties that fit within the slide
+        num_cols = 2
+        
+        # New, smaller dimensions and corrected positioning
+        box_width = Inches(4.2)
+        box_height = Inches(1.5)
+        start_left = Inches(0.7)
+        start_top = Inches(1.8) # Lowered to give title more space
+        horz_gap = Inches(0.2)
+        vert_gap = Inches(0.2)
+
+        # Create boxes in a 2x2 grid
+        for i, point in enumerate(points[:4]):  # Max 4 boxes
+            row = i // num_cols
+            col = i % num_cols
+            
+            # Calculate position based on new properties
+            left = start_left + col * (box_width + horz_gap)
+            top = start_top + row * (box_height + vert_gap)
+
+            # Create rounded box with new dimensions
+            box = self.create_professional_shape(
+                slide, MSO_SHAPE.ROUNDED_RECTANGLE,
+                left, top, box_width, box_height, # Use new dimensions
+                box_colors[i % len(box_colors)],
+                transparency=0.15
+            )
+
+            # Add text with automatic contrast, slightly padded
+            text_color = self.get_contrast_color(box_colors[i % len(box_colors)])
+            self.create_professional_text_box(
+                slide, left + Inches(0.2), top + Inches(0.2),
+                box_width - Inches(0.4), box_height - Inches(0.4), # Text box fits inside shape
+                point,
+                text_color, 
+                font_size=14, # Slightly smaller font for better fit
+                alignment=PP_ALIGN.CENTER
+            )
+
+    def _create_text_slide_layout(self, slide, slide_data, palette):
+        """Creates standard bullet points (without title)"""
+        # 1. Ensure we always have content
+        content_points = slide_data.get("content_points", ["Key points not specified"])
+        if not content_points or not any(content_points):  # Handle empty lists
+            content_points = ["Important content goes here"]
+        
+        # 2. Bullet points (starting below where title would be)
+        y_start = 2.2  # Start position accounts for title space
+        for i, point in enumerate(content_points[:6]):  # Max 6 points
+            # Skip empty points
+            if not point.strip():
+                continue
+                
+            # Bullet marker
+            create_professional_shape(
+                slide, MSO_SHAPE.OVAL,
+                Inches(1), Inches(y_start + i * 0.7),
+                Inches(0.15), Inches(0.15),
+                palette["accent"]
+            )
+            
+            # Bullet text
+            self.create_professional_text_box(
+                slide, 
+                Inches(1.4), Inches(y_start + i * 0.7 - 0.1),
+                Inches(7), Inches(0.6),
+                point, 
+                palette, 
+                font_size=16, 
+                text_color_key="text"
+            )
+            
+            # Prevent overflow
+            if y_start + (i * 0.7) > 6.5:
+                break
+
+
+
+
+    def _create_image_slide_layout(self, slide, slide_data, palette):
+        """Fallback layout when image fails to load"""
+        y_start = 2.2
+        content_points = slide_data.get("content_points", [])
+        
+        for i, point in enumerate(content_points[:4]):  # Max 4 points
+            create_professional_shape(
+                slide, MSO_SHAPE.OVAL,
+                Inches(1), Inches(y_start + i * 0.7), Inches(0.12), Inches(0.12),
+                palette["accent"]
+            )
+            self.create_professional_text_box(
+                slide, Inches(1.3), Inches(y_start + i * 0.7 - 0.1), 
+                Inches(7), Inches(0.5), point,
+                palette, font_size=14, text_color_key="text"
+            )
+
+
+
+
+    def _render_in_pool(self, slides, image_paths, theme):
+        """Submits every content slide to the render pool; [] when the deck
+        is rendered in-process (pool disabled, small deck or pptx backend)"""
+        if self.backend != "ooxml" or PPT_RENDER_WORKERS < 1 or len(slides) < PPT_RENDER_MIN_SLIDES:
+            return []
+        pool = render_pool()
+        return [
+            pool.submit(render_content_slide, slide_data, image_paths.get(slide_data.get("slide_number", 1)),
+                        theme, slide_data.get("slide_number", 1) + 2, random.getrandbits(32))
+            for slide_data in slides
+        ]
+
+    def build(self, presentation_meta, theme, toc_data, slides, image_paths, progress=None, timings=None,
+              output=None):
+            """Builds the deck and streams it into `output` (any writable binary
+            file object, left open), or into a new BytesIO that is returned
+            rewound"""
+            palette_index = theme.get("palette_index", 0)
+            if isinstance(palette_index, int) and 0 <= palette_index < len(PROFESSIONAL_PALETTES):
+                prs = compiled_presentation(palette_index)
+            else:
+                prs = new_presentation()
+                prs.slide_width = Inches(10.0) 
+                prs.slide_height = Inches(5.625)
+                self._apply_corporate_design(prs, theme)
+            
+            # Content slides go to the render pool first so they render
+            # while the title and TOC slides are made here
+            rendered = self._render_in_pool(slides, image_paths, theme)
+            try:
+                self.create_title_slide(prs, presentation_meta, theme)
+                self.create_toc_slide(prs, toc_data, theme)
+
+                for i, slide_data in enumerate(slides):
+                    slide = prs.slides.add_slide(prs.slide_layouts[6])
+                    slide_num = slide_data.get("slide_number", 1)
+                    image_path = image_paths.get(slide_num)
+                    presentation_slide_num = slide_num + 2
+                    print(f"Creating slide {presentation_slide_num}: {slide_data.get('title', 'Untitled')}")
+                    if rendered:
+                        content, fallbacks = rendered[i].result()
+                        if fallbacks:
+                            FALLBACKS.inc(fallbacks, kind="image_layout")
+                        SlideWriter.restore(slide, content).flush()  # adds the image parts here
+                    else:
+                        slide = self._canvas(slide)
+                        self.create_content_slide(slide, slide_data, image_path, theme, presentation_slide_num)
+                        self._finish(slide)
+                    if progress:
+                        progress("slide_built", slide=presentation_slide_num, total=len(slides) + 2)
+            finally:
+                for future in rendered:
+                    future.cancel()
+
+            # Media parts are stored, XML deflated at PPT_ZIP_LEVEL; each part
+            # goes to `output` as soon as it is serialized
+            ppt_bytes_io = BytesIO() if output is None else output
+            with timed_stage("save", timings):
+                write_package(prs, ppt_bytes_io)
+            if output is None:
+                ppt_bytes_io.seek(0)
+            return ppt_bytes_io
+     
+
+
+_render_pool = None
+_render_pool_pid = None
+_render_pool_lock = threading.Lock()
+
+
+def render_pool():
+    """Process pool for content slides (see PPT_RENDER_WORKERS)"""
+    global _render_pool, _render_pool_pid
+    with _render_pool_lock:
+        if _render_pool is None or _render_pool_pid != os.getpid():
+            # spawn, not fork: the parent is a threaded server process
+            _render_pool = ProcessPoolExecutor(
+                max_workers=PPT_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _render_pool_pid = os.getpid()
+        return _render_pool
+
+
+def shutdown_render_pool():
+    global _render_pool
+    with _render_pool_lock:
+        pool, _render_pool = _render_pool, None
+    if pool is not None and _render_pool_pid == os.getpid():
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def render_content_slide(slide_data, image_path, theme, slide_number, seed):
+    """Renders one content slide on a detached SlideWriter; runs in the
+    render pool. Returns (SlideWriter.rendered(), image layout fallbacks)."""
+    random.seed(seed)
+    fallbacks = FALLBACKS.get(kind="image_layout")
+    writer = SlideWriter()
+    ProfessionalPPTBuilder("ooxml").create_content_slide(writer, slide_data, image_path, theme, slide_number)
+    return writer.rendered(), FALLBACKS.get(kind="image_layout") - fallbacks
@@ -0,0 +1,325 @@
+import asyncio
+import base64
+import functools
+import os
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import BytesIO
+from PIL import Image
+from openai_clients import get_async_openai_client, get_openai_client
+from tqdm import tqdm
+from image_cache import ImageCache
+
+IMAGE_MODEL = "gpt-image-1"
+IMAGE_SIZE = "1024x1024"
+# Pipeline(image_backend=...) default
+IMAGE_BACKEND = os.getenv("IMAGE_BACKEND", "gpt-image").lower()
+# Threads in which AsyncImageGenerator waits on the image cache's locks (they
+# block) while its API calls run on the event loop
+IMAGE_CACHE_WAIT_THREADS = int(os.getenv("IMAGE_CACHE_WAIT_THREADS", "32"))
+
+_DALLE_STYLE = """
+professional corporate design, clean minimal aesthetic, high-end business presentation style,
+sophisticated color scheme, premium quality, modern flat design, no text overlays,
+suitable for executive presentation, clean background, professional photography style,
+corporate branding appropriate, business-focused imagery
+"""
+
+
+def _image_bytes(response):
+    """Extracts and validates the PNG bytes of an images.generate response"""
+    # Handle response
+    if hasattr(response.data[0], 'image'):  # Direct bytes
+        img_data = response.data[0].image
+    elif hasattr(response.data[0], 'b64_json'):  # Base64
+        img_data = base64.b64decode(response.data[0].b64_json)
+    else:
+        raise ValueError("Unsupported image response format")
+
+    # Validate and store the API bytes as-is (re-encoding a PNG costs CPU and
+    # gains nothing; sized variants are made by image_postprocess at embed time)
+    with Image.open(BytesIO(img_data)) as img:
+        img.verify()
+    return img_data
+
+
+class ImageGenerator:
+    model = IMAGE_MODEL
+    style = "professional corporate style"
+    request_options = {}
+    key_prefix = ""  # keeps each model's images apart in the cache
+    legacy_keys = False  # also serve images cached under the bare prompt
+
+    def __init__(self, api_key=None, max_workers=10, cache_dir="img_cache", client=None):
+        # Reuse the process-wide pooled client instead of opening a new connection pool
+        self.client = client or get_openai_client(api_key)
+        self.max_workers = max_workers
+        self.cache_dir = cache_dir
+        self.cache = ImageCache.for_directory(cache_dir)
+        self._executor = None
+        self._pending = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _get_cache_key(self, prompt):
+        """Generate consistent cache key from prompt"""
+        return hashlib.sha256((self.key_prefix + prompt).encode()).hexdigest()
+
+    def _legacy_cache_key(self, prompt):
+        """Key the image was cached under before key_prefix existed, if any"""
+        return hashlib.sha256(prompt.encode()).hexdigest() if self.legacy_keys else None
+
+    def _get_cache_path(self, prompt):
+        """Generate consistent cache filename from prompt"""
+        return self.cache.path_for(self._get_cache_key(prompt))
+
+    def _generate_single_image(self, prompt):
+        """Core image generation logic"""
+        try:
+            # Concurrent requests for the same prompt share one API call
+            return self.cache.get_or_create(
+                self._get_cache_key(prompt),
+                lambda f: self._request_image(prompt, f),
+                fallback_key=self._legacy_cache_key(prompt)
+            )
+        except Exception as e:
+            print(f"⚠️ Failed to generate image: {str(e)}")
+            return None
+
+    def _request_image(self, prompt, out_file):
+        """Calls the image API and writes the PNG to out_file"""
+        response = self.client.images.generate(
+            model=self.model,
+            prompt=f"{prompt}, {self.style}",
+            size=IMAGE_SIZE,
+            **self.request_options
+        )
+        out_file.write(_image_bytes(response))
+
+    def submit(self, prompt):
+        """Starts generating one image in the background; see collect()"""
+        if prompt in self._pending:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self._pending[prompt] = self._executor.submit(self._generate_single_image, prompt)
+
+    def cancel(self):
+        """Drops submitted images that have not started yet"""
+        for future in self._pending.values():
+            future.cancel()
+        self._shutdown()
+
+    def _shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._pending = {}
+
+    def _drop_unrequested(self, prompts):
+        """Cancels submitted images that are not in `prompts`. One that has
+        already started still finishes (into the cache), but isn't waited for."""
+        wanted = set(prompts)
+        for prompt in [p for p in self._pending if p not in wanted]:
+            self._pending.pop(prompt).cancel()
+
+    def collect(self, progress=None, prompts=None):
+        """
+        Wait for the submitted images
+        Args:
+            progress: Optional callable(event, **data) notified as each image finishes
+            prompts: Optional list of the prompts still needed; other submitted images are dropped
+        Returns:
+            Dict of {prompt: image_path}
+        """
+        if prompts is not None:
+            self._drop_unrequested(prompts)
+        results = {}
+        futures = {future: prompt for prompt, future in self._pending.items()}
+
+        try:
+            # Process with progress bar
+            for done, future in enumerate(tqdm(
+                as_completed(futures),
+                total=len(futures),
+                desc="🎨 Generating images",
+                unit="image"
+            ), start=1):
+                prompt = futures[future]
+                results[prompt] = future.result()
+                if progress:
+                    progress("image_done", completed=done, total=len(futures),
+                             ok=results[prompt] is not None)
+        except BaseException:
+            # Don't keep paying for images nobody will use
+            self.cancel()
+            raise
+
+        self._shutdown()
+        return results
+
+    def generate_images(self, prompts, progress=None):
+        """
+        Generate multiple images concurrently
+        Args:
+            prompts: List of prompt strings; images submitted earlier for other prompts are dropped
+            progress: Optional callable(event, **data) notified as each image finishes
+        Returns:
+            Dict of {prompt: image_path}
+        """
+        for prompt in prompts:
+            self.submit(prompt)
+        return self.collect(progress=progress, prompts=prompts)
+
+
+_cache_pool = None
+_cache_pool_pid = None
+_cache_pool_lock = threading.Lock()
+
+
+def _cache_threads():
+    global _cache_pool, _cache_pool_pid
+    with _cache_pool_lock:
+        if _cache_pool is None or _cache_pool_pid != os.getpid():
+            _cache_pool = ThreadPoolExecutor(max_workers=IMAGE_CACHE_WAIT_THREADS, thread_name_prefix="image-cache")
+            _cache_pool_pid = os.getpid()
+        return _cache_pool
+
+
+class AsyncImageGenerator:
+    """ImageGenerator for the asyncio pipeline: one task per image on the
+    shared event loop instead of one thread, with a semaphore capping how
+    many of this deck's images are requested at once (the process-wide
+    OpenAI rate limiter still applies on top). Only the wait on the image
+    cache's locks happens in a thread."""
+
+    model = ImageGenerator.model
+    style = ImageGenerator.style
+    request_options = ImageGenerator.request_options
+    key_prefix = ImageGenerator.key_prefix
+    legacy_keys = ImageGenerator.legacy_keys
+
+    def __init__(self, api_key=None, max_concurrency=10, cache_dir="img_cache", client=None):
+        self.client = client or get_async_openai_client(api_key)
+        self.max_concurrency = max_concurrency
+        self.cache_dir = cache_dir
+        self.cache = ImageCache.for_directory(cache_dir)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._pending = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _get_cache_key(self, prompt):
+        """Generate consistent cache key from prompt"""
+        return hashlib.sha256((self.key_prefix + prompt).encode()).hexdigest()
+
+    def _legacy_cache_key(self, prompt):
+        """Key the image was cached under before key_prefix existed, if any"""
+        return hashlib.sha256(prompt.encode()).hexdigest() if self.legacy_keys else None
+
+    async def _generate_single_image(self, prompt):
+        loop = asyncio.get_running_loop()
+
+        def produce(out_file):
+            # The API call runs on the event loop; this cache thread only waits for it
+            out_file.write(asyncio.run_coroutine_threadsafe(self._request_image(prompt), loop).result())
+
+        try:
+            # Same single-flight and cross-process file lock as ImageGenerator, so
+            # sync and async callers in any worker generate a prompt only once
+            return await loop.run_in_executor(_cache_threads(), functools.partial(
+                self.cache.get_or_create, self._get_cache_key(prompt), produce,
+                fallback_key=self._legacy_cache_key(prompt)
+            ))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Failed to generate image: {str(e)}")
+            return None
+
+    async def _request_image(self, prompt):
+        """Calls the image API; returns the PNG bytes"""
+        async with self._semaphore:
+            response = await self.client.images.generate(
+                model=self.model,
+                prompt=f"{prompt}, {self.style}",
+                size=IMAGE_SIZE,
+                **self.request_options
+            )
+        return await asyncio.to_thread(_image_bytes, response)
+
+    def submit(self, prompt):
+        """Starts generating one image as a task (call from the event loop)"""
+        if prompt not in self._pending:
+            self._pending[prompt] = asyncio.ensure_future(self._generate_single_image(prompt))
+
+    def cancel(self):
+        """Stops waiting for every submitted image; one whose API call has
+        already started still finishes into the cache"""
+        for task in self._pending.values():
+            task.cancel()
+        self._pending = {}
+
+    def _drop_unrequested(self, prompts):
+        """Cancels submitted images that are not in `prompts`"""
+        wanted = set(prompts)
+        for prompt in [p for p in self._pending if p not in wanted]:
+            self._pending.pop(prompt).cancel()
+
+    async def collect(self, progress=None, prompts=None):
+        """Awaits the submitted images (only `prompts`, if given: the others are
+        cancelled); returns {prompt: image_path}"""
+        if prompts is not None:
+            self._drop_unrequested(prompts)
+
+        async def labelled(prompt, task):
+            return prompt, await task
+
+        results = {}
+        total = len(self._pending)
+        try:
+            for done, next_result in enumerate(asyncio.as_completed(
+                [labelled(prompt, task) for prompt, task in self._pending.items()]
+            ), start=1):
+                prompt, path = await next_result
+                results[prompt] = path
+                if progress:
+                    progress("image_done", completed=done, total=total, ok=path is not None)
+        except BaseException:
+            # Don't keep paying for images nobody will use
+            self.cancel()
+            raise
+        self._pending = {}
+        return results
+
+    async def generate_images(self, prompts, progress=None):
+        """Submits prompts and awaits them; images submitted earlier for other
+        prompts are cancelled"""
+        for prompt in prompts:
+            self.submit(prompt)
+        return await self.collect(progress=progress, prompts=prompts)
+
+
+class DallEImageGenerator(ImageGenerator):
+    """ImageGenerator on DALL-E 3 in HD, with the long corporate style suffix"""
+    model = "dall-e-3"
+    style = _DALLE_STYLE
+    request_options = {"quality": "hd", "response_format": "b64_json"}
+    key_prefix = "dall-e-3:"
+    # The DALL-E entry points cached images under the bare prompt before they
+    # moved onto the engine; keep serving those instead of paying for them again
+    legacy_keys = True
+
+
+class AsyncDallEImageGenerator(AsyncImageGenerator):
+    model = DallEImageGenerator.model
+    style = DallEImageGenerator.style
+    request_options = DallEImageGenerator.request_options
+    key_prefix = DallEImageGenerator.key_prefix
+    legacy_keys = DallEImageGenerator.legacy_keys
+
+
+# name: (threaded generator, asyncio generator)
+IMAGE_BACKENDS = {
+    "gpt-image": (ImageGenerator, AsyncImageGenerator),
+    "dall-e": (DallEImageGenerator, AsyncDallEImageGenerator),
+}
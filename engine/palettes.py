@@ -0,0 +1,108 @@
+PROFESSIONAL_PALETTES = [
+    {
+        "name": "Corporate Blue",
+        "primary": "#1E3A8A", "secondary": "#3B82F6", "accent": "#60A5FA",
+        "text": "#FFFFFF", "text_dark": "#1F2937", "gradient_start": "#1E3A8A", "gradient_end": "#3B82F6"
+    },
+    {
+        "name": "Elegant Gray",
+        "primary": "#4B5563", "secondary": "#6B7280", "accent": "#9CA3AF",
+        "text": "#F9FAFB", "text_dark": "#111827", "gradient_start": "#4B5563", "gradient_end": "#9CA3AF"
+    },
+    {
+        "name": "Forest Green",
+        "primary": "#065F46", "secondary": "#10B981", "accent": "#34D399",
+        "text": "#ECFDF5", "text_dark": "#064E3B", "gradient_start": "#065F46", "gradient_end": "#10B981"
+    },
+    {
+        "name": "Sunset Orange",
+        "primary": "#C2410C", "secondary": "#F97316", "accent": "#FB923C",
+        "text": "#FFF7ED", "text_dark": "#7C2D12", "gradient_start": "#C2410C", "gradient_end": "#F97316"
+    },
+    {
+        "name": "Royal Purple",
+        "primary": "#5B21B6", "secondary": "#8B5CF6", "accent": "#A78BFA",
+        "text": "#F3E8FF", "text_dark": "#3B0764", "gradient_start": "#5B21B6", "gradient_end": "#8B5CF6"
+    },
+    {
+        "name": "Ocean Teal",
+        "primary": "#0F766E", "secondary": "#14B8A6", "accent": "#2DD4BF",
+        "text": "#E0F2FE", "text_dark": "#134E4A", "gradient_start": "#0F766E", "gradient_end": "#14B8A6"
+    },
+    {
+        "name": "Warm Sand",
+        "primary": "#92400E", "secondary": "#D97706", "accent": "#F59E0B",
+        "text": "#FFF8E1", "text_dark": "#78350F", "gradient_start": "#92400E", "gradient_end": "#D97706"
+    },
+    {
+        "name": "Modern Slate",
+        "primary": "#1E293B", "secondary": "#334155", "accent": "#64748B",
+        "text": "#F1F5F9", "text_dark": "#0F172A", "gradient_start": "#1E293B", "gradient_end": "#334155"
+    },
+    {
+        "name": "Deep Crimson",
+        "primary": "#7F1D1D", "secondary": "#B91C1C", "accent": "#EF4444",
+        "text": "#FEF2F2", "text_dark": "#4B0505", "gradient_start": "#7F1D1D", "gradient_end": "#B91C1C"
+    },
+    {
+        "name": "Cool Indigo",
+        "primary": "#4338CA", "secondary": "#6366F1", "accent": "#818CF8",
+        "text": "#EEF2FF", "text_dark": "#312E81", "gradient_start": "#4338CA", "gradient_end": "#6366F1"
+    },
+    {
+        "name": "Fresh Lime",
+        "primary": "#365314", "secondary": "#4ADE80", "accent": "#A7F3D0",
+        "text": "#F0FDF4", "text_dark": "#1C2F0E", "gradient_start": "#365314", "gradient_end": "#4ADE80"
+    },
+    {
+        "name": "Midnight Black",
+        "primary": "#111827", "secondary": "#374151", "accent": "#6B7280",
+        "text": "#F9FAFB", "text_dark": "#000000", "gradient_start": "#111827", "gradient_end": "#374151"
+    },
+    {
+        "name": "Soft Coral",
+        "primary": "#BE123C", "secondary": "#F43F5E", "accent": "#FCA5A5",
+        "text": "#FFF1F2", "text_dark": "#831843", "gradient_start": "#BE123C", "gradient_end": "#F43F5E"
+    },
+    {
+        "name": "Steel Blue",
+        "primary": "#1E40AF", "secondary": "#3B82F6", "accent": "#60A5FA",
+        "text": "#E0E7FF", "text_dark": "#1E3A8A", "gradient_start": "#1E40AF", "gradient_end": "#3B82F6"
+    },
+    {
+        "name": "Bright Cyan",
+        "primary": "#0E7490", "secondary": "#22D3EE", "accent": "#67E8F9",
+        "text": "#ECFEFF", "text_dark": "#164E63", "gradient_start": "#0E7490", "gradient_end": "#22D3EE"
+    },
+    {
+        "name": "Goldenrod",
+        "primary": "#B45309", "secondary": "#FBBF24", "accent": "#FCD34D",
+        "text": "#FFFBEB", "text_dark": "#78350F", "gradient_start": "#B45309", "gradient_end": "#FBBF24"
+    },
+    {
+        "name": "Classic Navy",
+        "primary": "#0C4A6E", "secondary": "#2563EB", "accent": "#60A5FA",
+        "text": "#EFF6FF", "text_dark": "#1E3A8A", "gradient_start": "#0C4A6E", "gradient_end": "#2563EB"
+    },
+    {
+        "name": "Rich Burgundy",
+        "primary": "#6B0218", "secondary": "#9F1239", "accent": "#DC2626",
+        "text": "#FEE2E2", "text_dark": "#4B0109", "gradient_start": "#6B0218", "gradient_end": "#9F1239"
+    },
+    {
+        "name": "Vibrant Orange",
+        "primary": "#C2410C", "secondary": "#F97316", "accent": "#FDBA74",
+        "text": "#FFF7ED", "text_dark": "#7C2D12", "gradient_start": "#C2410C", "gradient_end": "#F97316"
+    },
+    {
+        "name": "Dusty Rose",
+        "primary": "#881337", "secondary": "#BE185D", "accent": "#F472B6",
+        "text": "#FFF1F2", "text_dark": "#4B0630", "gradient_start": "#881337", "gradient_end": "#BE185D"
+    }
+    
+]
+
+
+def hex_to_rgb(hexstr):
+    h = hexstr.lstrip("#")
+    return tuple(int(h[i:i+2], 16) for i in (0, 2, 4))
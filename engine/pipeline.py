@@ -0,0 +1,337 @@
+import asyncio
+import os
+import random
+import time
+import traceback
+import uuid
+from io import BytesIO
+
+import cloudinary
+from dotenv import load_dotenv
+
+from jobs import JobCancelled
+from metrics import DECK_BYTES, FALLBACKS, GENERATIONS, SLIDE_IMAGES, timed_stage
+from openai_clients import get_async_openai_client, get_openai_client
+from storage import ChunkedUpload, CloudinaryStorage, PPT_LOCAL_FALLBACK, save_local_copy
+
+from .builder import ProfessionalPPTBuilder
+from .images import IMAGE_BACKEND, IMAGE_BACKENDS
+from .palettes import PROFESSIONAL_PALETTES
+from .planner import EnhancedSlidePlanner, plan_cache
+
+# Decks smaller than this are treated as empty builds
+MIN_DECK_BYTES = 1024
+
+
+def configure_services():
+    """Loads .env, checks the credentials and configures Cloudinary; returns
+    the OpenAI API key"""
+    load_dotenv()
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    cloud_name = os.getenv("CLOUDINARY_CLOUD_NAME")
+    api_key = os.getenv("CLOUDINARY_API_KEY")
+    api_secret = os.getenv("CLOUDINARY_API_SECRET")
+
+    if not openai_api_key:
+        raise ValueError("OPENAI_API_KEY not set in environment variables")
+    if not (cloud_name and api_key and api_secret):
+        raise ValueError("Cloudinary credentials missing in .env")
+
+    cloudinary.config(cloud_name=cloud_name, api_key=api_key, api_secret=api_secret, secure=True)
+    return openai_api_key
+
+
+def _has_pdf_image(slide, image_library):
+    """Whether a streamed slide should wait for / use a figure from the source
+    PDF instead of being sent to the image API right away"""
+    if image_library is None:
+        return False
+    if not image_library.complete:
+        return True  # plan replayed from the cache: matched after ensure_loaded()
+    return image_library.match(slide) is not None
+
+
+def _reuse_pdf_images(slides, image_library, report):
+    """{slide_num: path} for the image slides a PDF figure was found for"""
+    if image_library is None:
+        return {}
+    image_library.retain(slides)
+    reused = {}
+    for s in slides:
+        path = image_library.match(s)
+        if path:
+            reused[s["slide_number"]] = path
+    if reused:
+        SLIDE_IMAGES.inc(len(reused), source="pdf")
+    report("pdf_images_matched", matched=len(reused), available=len(image_library))
+    return reused
+
+
+def _map_images(image_prompts, generated_images, report, timings):
+    """Maps {slide_num: prompt} and {prompt: path} to {slide_num: path}"""
+    image_paths = {
+        slide_num: generated_images[prompt]
+        for slide_num, prompt in image_prompts.items()
+        if prompt in generated_images
+    }
+    missing = sum(1 for p in image_paths.values() if not p)
+    if missing:
+        FALLBACKS.inc(missing, kind="image_missing")
+    report("images_finished", generated=len(image_paths) - missing, duration=timings["images"])
+    return image_paths
+
+
+def _deck_public_id():
+    # Decks are uploaded with overwrite=True and finish concurrently: the
+    # timestamp alone made two decks of the same second share one URL
+    return f"ppt/presentation_{int(time.time())}_{uuid.uuid4().hex[:12]}"
+
+
+def _image_prompt(s):
+    return s.get("image_concept", f"Image for slide {s['slide_number']}")
+
+
+class Pipeline:
+    """Plan -> images -> build -> upload, with pluggable parts.
+
+    Entry points create one Pipeline per process and call generate() (or
+    agenerate() on the shared event loop) per deck. Everything that is
+    safe to share lives on the instance or in the engine modules: the
+    pooled OpenAI clients, the plan and image caches, the builder with its
+    compiled templates and render pool, the storage backend and the
+    metrics. Per-deck state (planner, image generator) is created per call.
+
+    image_backend: a key of engine.images.IMAGE_BACKENDS (default
+    IMAGE_BACKEND). local_fallback: keep the deck on disk when the upload
+    fails (default PPT_LOCAL_FALLBACK). client/aclient: fixed OpenAI
+    clients instead of the process-wide pooled ones (e.g. fakes in
+    benchmark.py).
+    """
+
+    def __init__(self, image_backend=None, builder=None, storage=None, planner_class=EnhancedSlidePlanner,
+                 local_fallback=None, image_workers=10, client=None, aclient=None):
+        self.api_key = configure_services()
+        self.image_backend = (image_backend or IMAGE_BACKEND).lower()
+        if self.image_backend not in IMAGE_BACKENDS:
+            raise ValueError(f"Unknown image backend {self.image_backend!r} "
+                             f"(expected one of {', '.join(IMAGE_BACKENDS)})")
+        self.builder = builder or ProfessionalPPTBuilder()
+        self.storage = storage or CloudinaryStorage()
+        self.planner_class = planner_class
+        self.plan_cache = plan_cache
+        self.local_fallback = PPT_LOCAL_FALLBACK if local_fallback is None else local_fallback
+        self.image_workers = image_workers
+        self.client = client
+        self.aclient = aclient
+
+    def openai_client(self):
+        # Resolved per call: the pooled client is replaced after a fork
+        return self.client or get_openai_client(self.api_key)
+
+    def async_openai_client(self):
+        return self.aclient or get_async_openai_client(self.api_key)
+
+    def generate(self, slide_count, summary_text, progress=None, use_cache=True, timings=None,
+                 cache_text=None, image_library=None):
+        """Runs plan -> images -> build -> upload and returns the deck URL.
+        `progress(event, **data)` is notified at each stage boundary (see
+        JobManager for the job variant). use_cache=False forces a fresh
+        slide plan. Per-stage seconds are written into the `timings` dict
+        when one is passed (and always into /metrics). summary_text may be
+        an iterable of sections (e.g. PDF pages being extracted); cache_text
+        then identifies the document for the plan cache. Image slides that
+        match a figure in `image_library` (a PDFImageLibrary) reuse it
+        instead of generating a new image."""
+        def report(event, **data):
+            if progress:
+                progress(event, **data)
+
+        timings = {} if timings is None else timings
+        try:
+            with timed_stage("total", timings):
+                ppt_url = self._run(slide_count, summary_text, report, progress, use_cache, timings, cache_text,
+                                    image_library)
+            GENERATIONS.inc(outcome="local" if ppt_url.startswith("file://") else "success")
+            return ppt_url
+        except JobCancelled:
+            GENERATIONS.inc(outcome="cancelled")
+            raise
+        except Exception as e:
+            GENERATIONS.inc(outcome="error")
+            print(f"❌ Generation failed: {e}\n{traceback.format_exc()}")
+            raise RuntimeError(f"Presentation generation failed: {e}") from e
+
+    def _run(self, slide_count, summary_text, report, progress, use_cache, timings, cache_text=None,
+             image_library=None):
+        client = self.openai_client()
+        planner = self.planner_class(client, cache=self.plan_cache)
+        image_gen = IMAGE_BACKENDS[self.image_backend][0](client=client, max_workers=self.image_workers)
+
+        def queue_image(s):
+            # Image slides are sent to the image pool while the plan is still streaming
+            report("slide_planned", slide=s.get("slide_number"), has_image=bool(s.get("has_image")))
+            if s.get("has_image") and "slide_number" in s and not _has_pdf_image(s, image_library):
+                image_gen.submit(_image_prompt(s))
+
+        try:
+            # 1. Plan slides
+            report("planning_started", slide_count=slide_count)
+            with timed_stage("plan", timings):
+                presentation_meta, theme, toc_data, slides = planner.plan_slides(
+                    summary_text, slide_count, on_slide=queue_image, use_cache=use_cache, cache_text=cache_text
+                )
+            if not slides or len(slides) < slide_count:
+                raise ValueError(f"Failed to generate adequate slides (requested: {slide_count}, got: {len(slides) if slides else 0})")
+            report("planning_finished", slides=len(slides), duration=timings["plan"])
+
+            # 2. Set theme and generate images
+            theme["palette_index"] = random.randint(0, len(PROFESSIONAL_PALETTES) - 1)
+
+            # Get image prompts from slides that need images and have no PDF figure
+            slides_needing_images = [s for s in slides if s.get("has_image")]
+            if image_library is not None:
+                image_library.ensure_loaded()
+            reused_images = _reuse_pdf_images(slides_needing_images, image_library, report)
+            image_prompts = {s["slide_number"]: _image_prompt(s) for s in slides_needing_images
+                             if s["slide_number"] not in reused_images}
+
+            # Wait for the images the final plan needs (returns {prompt: path}); ones
+            # submitted for streamed slides it dropped or renumbered are cancelled
+            report("images_started", total=len(image_prompts))
+            with timed_stage("images", timings):
+                generated_images = image_gen.generate_images(list(image_prompts.values()), progress=progress)
+        except BaseException:
+            image_gen.cancel()
+            raise
+
+        image_paths = _map_images(image_prompts, generated_images, report, timings)
+        image_paths.update(reused_images)
+
+        # 3. Build presentation (includes the save, also timed separately as "save"),
+        # streaming it into the upload
+        public_id = _deck_public_id()
+        deck = self._deck_output(public_id)
+        with timed_stage("build", timings):
+            self.builder.build(presentation_meta, theme, toc_data, slides, image_paths,
+                               progress=progress, timings=timings, output=deck)
+        self._check_deck(deck, report, timings)
+
+        # 4. Finish the upload
+        return self._upload_deck(deck, public_id, report, timings)
+
+    async def agenerate(self, slide_count, summary_text, progress=None, use_cache=True, timings=None,
+                        cache_text=None, image_library=None):
+        """generate() as a coroutine for the shared event loop
+        (async_runtime.event_loop). Planning and images are awaited on
+        AsyncOpenAI; the CPU-bound build and the upload run in the loop's
+        thread pool, so a deck only holds a thread while it is being built."""
+        def report(event, **data):
+            if progress:
+                progress(event, **data)
+
+        timings = {} if timings is None else timings
+        try:
+            with timed_stage("total", timings):
+                ppt_url = await self._arun(slide_count, summary_text, report, progress, use_cache, timings,
+                                           cache_text, image_library)
+            GENERATIONS.inc(outcome="local" if ppt_url.startswith("file://") else "success")
+            return ppt_url
+        except (JobCancelled, asyncio.CancelledError):
+            GENERATIONS.inc(outcome="cancelled")
+            raise
+        except Exception as e:
+            GENERATIONS.inc(outcome="error")
+            print(f"❌ Generation failed: {e}\n{traceback.format_exc()}")
+            raise RuntimeError(f"Presentation generation failed: {e}") from e
+
+    async def _arun(self, slide_count, summary_text, report, progress, use_cache, timings, cache_text=None,
+                    image_library=None):
+        aclient = self.async_openai_client()
+        planner = self.planner_class(self.openai_client(), cache=self.plan_cache, aclient=aclient)
+        image_gen = IMAGE_BACKENDS[self.image_backend][1](client=aclient, max_concurrency=self.image_workers)
+
+        def queue_image(s):
+            report("slide_planned", slide=s.get("slide_number"), has_image=bool(s.get("has_image")))
+            if s.get("has_image") and "slide_number" in s and not _has_pdf_image(s, image_library):
+                image_gen.submit(_image_prompt(s))
+
+        try:
+            # 1. Plan slides
+            report("planning_started", slide_count=slide_count)
+            with timed_stage("plan", timings):
+                presentation_meta, theme, toc_data, slides = await planner.aplan_slides(
+                    summary_text, slide_count, on_slide=queue_image, use_cache=use_cache, cache_text=cache_text
+                )
+            if not slides or len(slides) < slide_count:
+                raise ValueError(f"Failed to generate adequate slides (requested: {slide_count}, got: {len(slides) if slides else 0})")
+            report("planning_finished", slides=len(slides), duration=timings["plan"])
+
+            # 2. Set theme and await the images
+            theme["palette_index"] = random.randint(0, len(PROFESSIONAL_PALETTES) - 1)
+            slides_needing_images = [s for s in slides if s.get("has_image")]
+            if image_library is not None:
+                await asyncio.to_thread(image_library.ensure_loaded)
+            reused_images = _reuse_pdf_images(slides_needing_images, image_library, report)
+            image_prompts = {s["slide_number"]: _image_prompt(s) for s in slides_needing_images
+                             if s["slide_number"] not in reused_images}
+            report("images_started", total=len(image_prompts))
+            with timed_stage("images", timings):
+                generated_images = await image_gen.generate_images(list(image_prompts.values()), progress=progress)
+        except BaseException:
+            image_gen.cancel()
+            raise
+
+        image_paths = _map_images(image_prompts, generated_images, report, timings)
+        image_paths.update(reused_images)
+
+        # 3. Build in the loop's thread pool (CPU-bound), streaming into the upload
+        public_id = _deck_public_id()
+        deck = self._deck_output(public_id)
+        with timed_stage("build", timings):
+            await asyncio.to_thread(
+                self.builder.build, presentation_meta, theme, toc_data, slides, image_paths,
+                progress=progress, timings=timings, output=deck
+            )
+        self._check_deck(deck, report, timings)
+
+        # 4. Finish the upload (blocking SDK call) in the thread pool as well
+        return await asyncio.to_thread(self._upload_deck, deck, public_id, report, timings)
+
+    def _deck_output(self, public_id):
+        """Where the builder writes the deck: straight into a chunked upload,
+        or with local_fallback into memory, so a failed upload can still be
+        saved locally. Chunks of decks larger than the storage's chunk size
+        are sent during the build."""
+        if self.local_fallback:
+            return BytesIO()
+        return self.storage.open_upload(public_id)
+
+    def _check_deck(self, deck, report, timings):
+        # Validate presentation (decks under one chunk haven't been sent yet)
+        size = deck.tell()
+        if size < MIN_DECK_BYTES:
+            raise ValueError("Generated presentation is too small (likely empty)")
+        DECK_BYTES.observe(size)
+        report("build_finished", bytes=size, duration=timings["build"])
+
+    def _upload_deck(self, deck, public_id, report, timings):
+        report("upload_started")
+        try:
+            with timed_stage("upload", timings):
+                if isinstance(deck, ChunkedUpload):
+                    ppt_url = deck.finish()
+                else:
+                    ppt_url = self.storage.upload(deck, public_id=public_id)
+            report("upload_finished", url=ppt_url, duration=timings["upload"])
+            return ppt_url
+        except Exception as upload_error:
+            print(f"⚠️ Cloudinary upload failed: {upload_error}")
+            report("upload_failed", error=str(upload_error), duration=timings["upload"])
+            if not self.local_fallback:
+                raise
+
+            # 5. Local fallback (PPT_LOCAL_FALLBACK=1 or local_fallback=True)
+            FALLBACKS.inc(kind="local_upload")
+            local_path = save_local_copy(deck, f"{os.path.basename(public_id)}.pptx")
+            print(f"✓ Local copy saved: {local_path}")
+            return f"file://{local_path}"
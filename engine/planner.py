@@ -0,0 +1,648 @@
+import asyncio
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from doc_chunker import estimate_tokens, split_into_chunks
+from metrics import REGISTRY, CallbackMetric, FALLBACKS
+from plan_cache import PlanCache
+from plan_schema import (
+    OUTLINE_SCHEMA, OUTLINE_SLIDES_SCHEMA, PLAN_SCHEMA, POINTS_SCHEMA, SLIDES_SCHEMA,
+    repair_plan, response_format
+)
+from plan_stream import ContentSlidesScanner
+
+# Map-reduce planning: documents over the threshold are condensed chunk by chunk
+# (in parallel) into section notes before the single planning call
+PLAN_MAP_THRESHOLD_TOKENS = int(os.getenv("PLAN_MAP_THRESHOLD_TOKENS", "12000"))
+PLAN_CHUNK_TOKENS = int(os.getenv("PLAN_CHUNK_TOKENS", "6000"))
+PLAN_NOTES_BUDGET_TOKENS = int(os.getenv("PLAN_NOTES_BUDGET_TOKENS", "6000"))
+PLAN_MAP_WORKERS = int(os.getenv("PLAN_MAP_WORKERS", "8"))
+PLAN_MAP_MODEL = os.getenv("PLAN_MAP_MODEL", "gpt-4o-mini")
+# Notes per chunk when condensing a streamed document (its length isn't known up front)
+STREAM_NOTE_WORDS = int(os.getenv("STREAM_NOTE_WORDS", "150"))
+
+# "single": one completion writes the whole plan. "outline": a short outline call,
+# then every slide's bullets are written by parallel calls (output-token latency
+# no longer grows with slide_count)
+PLAN_MODE = os.getenv("PLAN_MODE", "single").lower()
+PLAN_EXPAND_WORKERS = int(os.getenv("PLAN_EXPAND_WORKERS", "8"))
+PLAN_EXPAND_MODEL = os.getenv("PLAN_EXPAND_MODEL")  # defaults to the planner's model
+
+# Enforce the plan JSON schema with structured outputs (set 0 for models without it)
+PLAN_STRUCTURED_OUTPUTS = os.getenv("PLAN_STRUCTURED_OUTPUTS", "1").lower() in ("1", "true", "yes")
+# Follow-up calls asking only for slides a malformed/short plan is missing
+PLAN_REPAIR_ATTEMPTS = int(os.getenv("PLAN_REPAIR_ATTEMPTS", "2"))
+
+# One plan cache per process, shared by every pipeline
+plan_cache = PlanCache()
+REGISTRY.register(CallbackMetric(
+    "ppt_plan_cache_lookups_total", "Slide plan cache lookups by result",
+    lambda: {("hit",): plan_cache.hits, ("miss",): plan_cache.misses},
+    labels=("result",), type_name="counter"
+))
+
+
+def clean_code_fence(s: str) -> str:
+    s = s.strip()
+    s = re.sub(r"^```(?:json)?\n", "", s)
+    s = re.sub(r"\n```$", "", s)
+    return s.strip()
+
+
+class EnhancedSlidePlanner:
+    MODEL = "gpt-4o"
+    # Bump whenever the prompt or the post-processing changes so cached plans are not reused
+    PROMPT_VERSION = "4"
+
+    def __init__(self, client, cache=None, aclient=None):
+        self.client = client
+        self.cache = cache
+        self.aclient = aclient  # AsyncOpenAI, for aplan_slides()
+
+    @staticmethod
+    def _normalize_slide(slide, index):
+        """Enforces the every-2nd-slide image rule on one planned slide"""
+        slide_num = slide.get("slide_number", index + 1)
+        slide["has_image"] = (slide_num % 2 == 0)
+        slide["slide_type"] = "image_slide" if slide["has_image"] else "text_heavy"
+        if slide["has_image"] and not slide.get("image_concept"):
+            slide["image_concept"] = f"Professional illustration representing {slide.get('title', 'slide content')}, clean corporate style, modern design"
+        return slide
+
+    def _cached_plan(self, doc_text, target_slide_count, use_cache, mode="single"):
+        """Returns (cache_key, cached plan or None)"""
+        if self.cache is None:
+            return None, None
+        version = self.PROMPT_VERSION if mode != "outline" else f"{self.PROMPT_VERSION}-outline"
+        cache_key = PlanCache.make_key(doc_text, target_slide_count, self.MODEL, version)
+        return cache_key, (self.cache.get(cache_key) if use_cache else None)
+
+    def _replay_cached(self, cached, on_slide):
+        print("📁 Using cached slide plan")
+        slides = cached["content_slides"]
+        if on_slide is not None:
+            for slide in slides:
+                on_slide(slide)
+        return cached["presentation_meta"], cached["theme"], cached["table_of_contents"], slides
+
+    # ----- map step for long documents -----
+
+    def _chunk_prompt(self, chunk, index, total, words):
+        return f"""
+Condense this excerpt (part {index}{f" of {total}" if total else ""}) of a longer document into notes
+for a presentation designer. Keep the key facts, figures, names, arguments and
+conclusions; drop repetition and boilerplate. Use plain bullet points, no preamble,
+at most {words} words.
+
+EXCERPT:
+{chunk}
+"""
+
+    def _map_plan(self, doc_text):
+        """Chunks for one map round and the word budget per chunk's notes, or None
+        when doc_text already fits the planning prompt"""
+        if estimate_tokens(doc_text) <= PLAN_MAP_THRESHOLD_TOKENS:
+            return None
+        chunks = split_into_chunks(doc_text, PLAN_CHUNK_TOKENS)
+        # Total notes stay within the budget however many chunks there are (~0.75 words/token)
+        words = max(60, int(PLAN_NOTES_BUDGET_TOKENS * 0.75 / len(chunks)))
+        return chunks, words
+
+    @staticmethod
+    def _join_notes(notes):
+        return "\n\n".join(f"SECTION {i}:\n{n.strip()}" for i, n in enumerate(notes, start=1) if n)
+
+    def _condense_chunk(self, chunk, index, total, words):
+        resp = self.client.chat.completions.create(
+            model=PLAN_MAP_MODEL,
+            messages=[{"role": "user", "content": self._chunk_prompt(chunk, index, total, words)}],
+            temperature=0.2,
+            max_tokens=words * 2
+        )
+        return resp.choices[0].message.content or ""
+
+    def condense(self, doc_text):
+        """Map step: summarizes a document too long for one planning prompt into
+        section notes, chunks in parallel. Repeats on the notes if they are still
+        too long, so the planning (reduce) call always gets a bounded input."""
+        while True:
+            plan = self._map_plan(doc_text)
+            if plan is None:
+                return doc_text
+            chunks, words = plan
+            print(f"✂️ Condensing {estimate_tokens(doc_text)} tokens in {len(chunks)} chunks")
+            with ThreadPoolExecutor(max_workers=min(PLAN_MAP_WORKERS, len(chunks))) as pool:
+                notes = list(pool.map(
+                    lambda item: self._condense_chunk(item[1], item[0], len(chunks), words),
+                    enumerate(chunks, start=1)
+                ))
+            condensed = self._join_notes(notes)
+            if len(condensed) >= len(doc_text):
+                return condensed  # no progress; don't loop forever
+            doc_text = condensed
+
+    def condense_stream(self, sections):
+        """condense() for a document that arrives as an iterable of sections
+        (e.g. PDF pages as they are extracted). Chunks are sent to the map
+        calls as soon as they fill up, so extraction and condensing overlap
+        and only the notes are kept once the text is known to be long."""
+        buffered, buffered_tokens = [], 0
+        pool, futures = None, []
+        try:
+            for section in sections:
+                buffered.append(section)
+                buffered_tokens += estimate_tokens(section)
+                if pool is None:
+                    if buffered_tokens <= PLAN_MAP_THRESHOLD_TOKENS:
+                        continue  # may still fit the planning prompt as-is
+                    pool = ThreadPoolExecutor(max_workers=PLAN_MAP_WORKERS)
+                    print("✂️ Long document: condensing sections as they arrive")
+                if buffered_tokens < PLAN_CHUNK_TOKENS:
+                    continue
+                *full, rest = split_into_chunks("\n\n".join(buffered), PLAN_CHUNK_TOKENS)
+                for chunk in full:
+                    futures.append(pool.submit(self._condense_chunk, chunk, len(futures) + 1, None,
+                                               STREAM_NOTE_WORDS))
+                buffered, buffered_tokens = [rest], estimate_tokens(rest)
+
+            if pool is None:
+                return "\n\n".join(buffered)
+            for chunk in split_into_chunks("\n\n".join(buffered), PLAN_CHUNK_TOKENS):
+                futures.append(pool.submit(self._condense_chunk, chunk, len(futures) + 1, None,
+                                           STREAM_NOTE_WORDS))
+            # Another (non-streamed) round if the notes are still too long
+            return self.condense(self._join_notes([f.result() for f in futures]))
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _acondense_chunk(self, chunk, index, total, words, semaphore):
+        async with semaphore:
+            resp = await self.aclient.chat.completions.create(
+                model=PLAN_MAP_MODEL,
+                messages=[{"role": "user", "content": self._chunk_prompt(chunk, index, total, words)}],
+                temperature=0.2,
+                max_tokens=words * 2
+            )
+        return resp.choices[0].message.content or ""
+
+    async def acondense(self, doc_text):
+        """condense() on self.aclient"""
+        semaphore = asyncio.Semaphore(PLAN_MAP_WORKERS)
+        while True:
+            plan = await asyncio.to_thread(self._map_plan, doc_text)
+            if plan is None:
+                return doc_text
+            chunks, words = plan
+            print(f"✂️ Condensing {estimate_tokens(doc_text)} tokens in {len(chunks)} chunks")
+            notes = await asyncio.gather(*(
+                self._acondense_chunk(chunk, i, len(chunks), words, semaphore)
+                for i, chunk in enumerate(chunks, start=1)
+            ))
+            condensed = self._join_notes(notes)
+            if len(condensed) >= len(doc_text):
+                return condensed
+            doc_text = condensed
+
+    # ----- planning (reduce) call -----
+
+    def _build_prompt(self, doc_text, target_slide_count):
+        return f"""
+You are a professional presentation designer creating a corporate-level presentation.
+
+STRUCTURE REQUIREMENTS:
+1. Title slide (handled separately)
+2. Table of Contents slide (handled separately)  
+3. Exactly {target_slide_count} content slides with substantial information
+4. Images will be added to every 2nd content slide automatically
+
+CONTENT REQUIREMENTS:
+- Each slide must have comprehensive, professional content
+- Titles: Clear, descriptive, professional (30-80 characters)
+- Content: 3-5 substantial bullet points per slide (40-120 characters each)
+- Professional tone throughout
+- Each slide should cover a distinct topic/section
+
+INPUT DOCUMENT:
+{doc_text}
+
+OUTPUT: JSON with this structure:
+{{
+  "presentation_meta": {{
+    "title": "Professional presentation title",
+    "subtitle": "Descriptive subtitle explaining the content",
+    "total_content_slides": {target_slide_count},
+    "estimated_duration": "{target_slide_count * 2}-{target_slide_count * 3} minutes"
+  }},
+  "theme": {{
+    "name": "Professional Theme Name",
+    "style": "corporate",
+    "palette_index": 0,
+    "mood": "professional"
+  }},
+  "table_of_contents": [
+    {{
+      "section_number": 1,
+      "section_title": "First main section title",
+      "slides": [1, 2]
+    }},
+    {{
+      "section_number": 2,
+      "section_title": "Second main section title", 
+      "slides": [3, 4]
+    }}
+  ],
+  "content_slides": [
+    {{
+      "slide_number": 1,
+      "section": "Introduction",
+      "title": "Professional slide title that clearly describes the content",
+      "content_points": [
+        "First comprehensive point with detailed explanation and context",
+        "Second substantial point providing valuable insights and information", 
+        "Third detailed point with specific examples and actionable content",
+        "Fourth comprehensive point that adds significant value to understanding"
+      ],
+      "slide_type": "text_heavy",
+      "has_image": false,
+      "image_concept": "Professional concept for image if needed"
+    }},
+    {{
+      "slide_number": 2,
+      "section": "Introduction", 
+      "title": "Second slide title with clear professional focus",
+      "content_points": [
+        "Detailed first point with comprehensive explanation and examples",
+        "Substantial second point providing deep insights and practical value",
+        "Third comprehensive point with specific data and actionable recommendations",
+        "Fourth detailed point that enhances understanding and provides clarity"
+      ],
+      "slide_type": "image_slide",
+      "has_image": true,
+      "image_concept": "Professional, clean image concept that supports the slide content and maintains corporate aesthetic"
+    }}
+  ]
+}}
+
+Create exactly {target_slide_count} content slides with professional, substantial content.
+Ensure every 2nd slide (slides 2, 4, 6, 8, etc.) has has_image: true.
+Return only valid JSON.
+"""
+
+    def _store_plan(self, cache_key, presentation_meta, theme, toc_data, slides):
+        if cache_key and slides:
+            self.cache.set(cache_key, {
+                "presentation_meta": presentation_meta,
+                "theme": theme,
+                "table_of_contents": toc_data,
+                "content_slides": slides
+            })
+
+    @staticmethod
+    def _response_format(name, schema):
+        return {"response_format": response_format(name, schema)} if PLAN_STRUCTURED_OUTPUTS else {}
+
+    def _parse_plan(self, raw):
+        """Parses the completion into (meta, theme, toc, slides). Malformed or
+        truncated JSON is repaired, keeping every slide that parsed on its own."""
+        data, repaired = repair_plan(clean_code_fence(raw or ""))
+        slides = [s for s in (data.get("content_slides") or []) if isinstance(s, dict)]
+        if repaired:
+            FALLBACKS.inc(kind="plan_repair")
+            print(f"🩹 Plan JSON was malformed; kept {len(slides)} complete slides")
+        return (data.get("presentation_meta") or {}, data.get("theme") or {},
+                data.get("table_of_contents") or [], slides)
+
+    @staticmethod
+    def _streamable(slide, seen, slide_count):
+        """Whether a streamed slide keeps its number through _finish_plan. Work
+        started for slides it drops or renumbers (image calls) would be wasted."""
+        number = slide.get("slide_number")
+        if not isinstance(number, int) or number in seen:
+            return False
+        if slide_count is not None and not 1 <= number <= slide_count:
+            return False
+        seen.add(number)
+        return True
+
+    def _complete(self, prompt, on_slide=None, schema_name="slide_plan", schema=PLAN_SCHEMA, slide_count=None):
+        """Runs the planning prompt; streams and reports slides when on_slide is set
+        (only the ones numbered 1..slide_count, once each)"""
+        options = self._response_format(schema_name, schema)
+        if on_slide is None:
+            resp = self.client.chat.completions.create(
+                model=self.MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.7,
+                **options
+            )
+            return resp.choices[0].message.content
+        stream = self.client.chat.completions.create(
+            model=self.MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.7,
+            stream=True,
+            **options
+        )
+        scanner = ContentSlidesScanner()
+        seen = set()
+        # Closing the stream frees the chat limiter slot, also when on_slide
+        # raises (e.g. JobCancelled) before the response is read to the end
+        with stream:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                for slide in scanner.feed(chunk.choices[0].delta.content or ""):
+                    if self._streamable(slide, seen, slide_count):
+                        on_slide(self._normalize_slide(slide, slide["slide_number"] - 1))
+        return scanner.text
+
+    async def _acomplete(self, prompt, on_slide=None, schema_name="slide_plan", schema=PLAN_SCHEMA,
+                         slide_count=None):
+        """_complete() on self.aclient (always streamed)"""
+        stream = await self.aclient.chat.completions.create(
+            model=self.MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.7,
+            stream=True,
+            **self._response_format(schema_name, schema)
+        )
+        scanner = ContentSlidesScanner()
+        seen = set()
+        async with stream:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                for slide in scanner.feed(chunk.choices[0].delta.content or ""):
+                    if on_slide is not None and self._streamable(slide, seen, slide_count):
+                        on_slide(self._normalize_slide(slide, slide["slide_number"] - 1))
+        return scanner.text
+
+    # ----- repair: re-request only the slides a plan is missing -----
+
+    @staticmethod
+    def _missing_numbers(slides, target_slide_count):
+        present = {s.get("slide_number") for s in slides}
+        return [n for n in range(1, target_slide_count + 1) if n not in present]
+
+    def _missing_prompt(self, doc_text, target_slide_count, presentation_meta, slides, missing, outline):
+        have = "\n".join(f"{s.get('slide_number')}. [{s.get('section', '')}] {s.get('title', '')}" for s in slides)
+        fields = ("slide_number, section, title, summary (one sentence) and image_concept" if outline else
+                  "slide_number, section, title, 3-5 content_points (40-120 characters each), "
+                  "slide_type, has_image (true on even slide numbers) and image_concept")
+        return f"""
+You are completing a {target_slide_count}-slide corporate presentation plan
+titled "{presentation_meta.get('title', '')}".
+
+INPUT DOCUMENT:
+{doc_text}
+
+SLIDES ALREADY PLANNED:
+{have or "(none)"}
+
+Write only these missing slides: {", ".join(str(n) for n in missing)}.
+Each needs {fields}. Cover topics the planned slides don't.
+Return only JSON: {{"content_slides": [...]}}
+"""
+
+    def _finish_plan(self, plan, target_slide_count):
+        """Orders, numbers and normalizes the slides and fills in a missing header"""
+        presentation_meta, theme, toc_data, slides = plan
+        by_number = {}
+        for slide in slides:
+            by_number.setdefault(slide.get("slide_number"), slide)
+        slides = sorted(by_number.values(), key=lambda s: (not isinstance(s.get("slide_number"), int),
+                                                           s.get("slide_number") or 0))
+        slides = slides[:target_slide_count]
+        for i, slide in enumerate(slides):
+            slide["slide_number"] = i + 1
+            self._normalize_slide(slide, i)
+        if not presentation_meta and slides:
+            presentation_meta = {"title": slides[0].get("section") or "Presentation", "subtitle": "",
+                                 "total_content_slides": len(slides)}
+        if not toc_data and slides:
+            sections = {}
+            for slide in slides:
+                sections.setdefault(slide.get("section") or "Overview", []).append(slide["slide_number"])
+            toc_data = [{"section_number": i, "section_title": title, "slides": numbers}
+                        for i, (title, numbers) in enumerate(sections.items(), start=1)]
+        return presentation_meta, theme, toc_data, slides
+
+    def _fill_missing(self, doc_text, target_slide_count, plan, outline=False):
+        presentation_meta, theme, toc_data, slides = plan
+        for _ in range(PLAN_REPAIR_ATTEMPTS):
+            missing = self._missing_numbers(slides, target_slide_count)
+            if not missing:
+                break
+            print(f"🩹 Re-requesting {len(missing)} missing slides: {missing}")
+            FALLBACKS.inc(kind="plan_missing_slides")
+            raw = self._complete(
+                self._missing_prompt(doc_text, target_slide_count, presentation_meta, slides, missing, outline),
+                schema_name="missing_slides", schema=OUTLINE_SLIDES_SCHEMA if outline else SLIDES_SCHEMA
+            )
+            slides = slides + self._parse_plan(raw)[3]
+        return self._finish_plan((presentation_meta, theme, toc_data, slides), target_slide_count)
+
+    async def _afill_missing(self, doc_text, target_slide_count, plan, outline=False):
+        presentation_meta, theme, toc_data, slides = plan
+        for _ in range(PLAN_REPAIR_ATTEMPTS):
+            missing = self._missing_numbers(slides, target_slide_count)
+            if not missing:
+                break
+            print(f"🩹 Re-requesting {len(missing)} missing slides: {missing}")
+            FALLBACKS.inc(kind="plan_missing_slides")
+            raw = await self._acomplete(
+                self._missing_prompt(doc_text, target_slide_count, presentation_meta, slides, missing, outline),
+                schema_name="missing_slides", schema=OUTLINE_SLIDES_SCHEMA if outline else SLIDES_SCHEMA
+            )
+            slides = slides + self._parse_plan(raw)[3]
+        return self._finish_plan((presentation_meta, theme, toc_data, slides), target_slide_count)
+
+    def plan_slides(self, doc_text, target_slide_count, on_slide=None, use_cache=True, mode=None,
+                    cache_text=None):
+        """Plans the deck. When `on_slide` is given the completion is streamed and
+        on_slide(slide) is called as soon as each content slide object closes,
+        so callers can start work on it while the rest of the plan is written.
+        Plans are served from / stored in `self.cache` unless use_cache is False.
+        mode="outline" plans titles first and expands the slides in parallel
+        (see _expand_slides); the default is PLAN_MODE. A malformed or short
+        completion is repaired and only the missing slides are re-requested.
+        doc_text may also be an iterable of sections (see condense_stream); the
+        cache key is then built from `cache_text`, e.g. a hash of the source file."""
+        mode = mode or PLAN_MODE
+        cache_key, cached = self._cached_plan(cache_text or doc_text, target_slide_count, use_cache, mode)
+        if cached:
+            return self._replay_cached(cached, on_slide)
+
+        # Long documents are condensed first; the cache key still uses the full text
+        notes = self.condense(doc_text) if isinstance(doc_text, str) else self.condense_stream(doc_text)
+        if mode != "outline":
+            raw = self._complete(self._build_prompt(notes, target_slide_count), on_slide,
+                                 slide_count=target_slide_count)
+            plan = self._fill_missing(notes, target_slide_count, self._parse_plan(raw))
+            self._store_plan(cache_key, *plan)
+            return plan
+
+        raw = self._complete(self._build_outline_prompt(notes, target_slide_count), on_slide,
+                             schema_name="slide_outline", schema=OUTLINE_SCHEMA, slide_count=target_slide_count)
+        presentation_meta, theme, toc_data, slides = self._fill_missing(
+            notes, target_slide_count, self._parse_plan(raw), outline=True
+        )
+        if slides:
+            with ThreadPoolExecutor(max_workers=min(PLAN_EXPAND_WORKERS, len(slides))) as pool:
+                points = list(pool.map(
+                    lambda slide: self._expand_slide(notes, presentation_meta, slides, slide), slides
+                ))
+            self._merge_points(slides, points)
+            self._store_plan(cache_key, presentation_meta, theme, toc_data, slides)
+        return presentation_meta, theme, toc_data, slides
+
+    async def aplan_slides(self, doc_text, target_slide_count, on_slide=None, use_cache=True, mode=None,
+                           cache_text=None):
+        """plan_slides() on self.aclient (AsyncOpenAI). Always streams; cache
+        reads/writes (and condensing a streamed document, whose sections come
+        from a blocking iterator) run in the loop's thread pool."""
+        mode = mode or PLAN_MODE
+        cache_key, cached = await asyncio.to_thread(
+            self._cached_plan, cache_text or doc_text, target_slide_count, use_cache, mode
+        )
+        if cached:
+            return self._replay_cached(cached, on_slide)
+
+        if isinstance(doc_text, str):
+            notes = await self.acondense(doc_text)
+        else:
+            notes = await asyncio.to_thread(self.condense_stream, doc_text)
+        if mode != "outline":
+            raw = await self._acomplete(self._build_prompt(notes, target_slide_count), on_slide,
+                                        slide_count=target_slide_count)
+            plan = await self._afill_missing(notes, target_slide_count, self._parse_plan(raw))
+            await asyncio.to_thread(self._store_plan, cache_key, *plan)
+            return plan
+
+        raw = await self._acomplete(self._build_outline_prompt(notes, target_slide_count), on_slide,
+                                    schema_name="slide_outline", schema=OUTLINE_SCHEMA,
+                                    slide_count=target_slide_count)
+        presentation_meta, theme, toc_data, slides = await self._afill_missing(
+            notes, target_slide_count, self._parse_plan(raw), outline=True
+        )
+        if slides:
+            semaphore = asyncio.Semaphore(PLAN_EXPAND_WORKERS)
+            points = await asyncio.gather(*(
+                self._aexpand_slide(notes, presentation_meta, slides, slide, semaphore) for slide in slides
+            ))
+            self._merge_points(slides, points)
+            await asyncio.to_thread(self._store_plan, cache_key, presentation_meta, theme, toc_data, slides)
+        return presentation_meta, theme, toc_data, slides
+
+    # ----- two-phase planning: outline, then parallel expansion -----
+
+    def _build_outline_prompt(self, doc_text, target_slide_count):
+        return f"""
+You are a professional presentation designer outlining a corporate-level presentation.
+Only plan the structure now; each slide's bullet points are written separately later.
+
+INPUT DOCUMENT:
+{doc_text}
+
+Plan exactly {target_slide_count} content slides, each covering a distinct topic.
+Titles: clear, descriptive, professional (30-80 characters).
+"summary": one sentence saying what the slide must convey.
+
+OUTPUT: JSON with this structure:
+{{
+  "presentation_meta": {{
+    "title": "Professional presentation title",
+    "subtitle": "Descriptive subtitle explaining the content",
+    "total_content_slides": {target_slide_count},
+    "estimated_duration": "{target_slide_count * 2}-{target_slide_count * 3} minutes"
+  }},
+  "theme": {{"name": "Professional Theme Name", "style": "corporate", "palette_index": 0, "mood": "professional"}},
+  "table_of_contents": [
+    {{"section_number": 1, "section_title": "First main section title", "slides": [1, 2]}}
+  ],
+  "content_slides": [
+    {{
+      "slide_number": 1,
+      "section": "Introduction",
+      "title": "Professional slide title that clearly describes the content",
+      "summary": "What this slide must convey",
+      "image_concept": "Professional, clean image concept that supports the slide content"
+    }}
+  ]
+}}
+
+Return only valid JSON.
+"""
+
+    def _expand_prompt(self, doc_text, presentation_meta, slides, slide):
+        # The document comes first so every expansion call shares one prompt prefix
+        # (cheaper and faster with the API's automatic prompt caching)
+        outline = "\n".join(f"{s.get('slide_number')}. {s.get('title', '')}" for s in slides)
+        return f"""
+INPUT DOCUMENT:
+{doc_text}
+
+PRESENTATION: {presentation_meta.get('title', '')}
+OUTLINE:
+{outline}
+
+Write the content_points for slide {slide.get('slide_number')} only:
+Title: {slide.get('title', '')}
+Section: {slide.get('section', '')}
+Must convey: {slide.get('summary', '')}
+
+3-5 substantial bullet points (40-120 characters each), professional tone, grounded in
+the document, not repeating what the other slides in the outline cover.
+Return only JSON: {{"content_points": ["...", "..."]}}
+"""
+
+    def _expansion_request(self, prompt):
+        return dict(
+            model=PLAN_EXPAND_MODEL or self.MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.7,
+            response_format=(response_format("slide_points", POINTS_SCHEMA) if PLAN_STRUCTURED_OUTPUTS
+                             else {"type": "json_object"})
+        )
+
+    @staticmethod
+    def _points_from(raw):
+        points = json.loads(clean_code_fence(raw or "")).get("content_points")
+        if not isinstance(points, list) or not points:
+            raise ValueError("no content_points in expansion")
+        return [str(p) for p in points]
+
+    def _expand_slide(self, doc_text, presentation_meta, slides, slide):
+        """Bullet points for one outlined slide, or None if the call failed"""
+        try:
+            resp = self.client.chat.completions.create(
+                **self._expansion_request(self._expand_prompt(doc_text, presentation_meta, slides, slide))
+            )
+            return self._points_from(resp.choices[0].message.content)
+        except Exception as e:
+            print(f"⚠️ Expanding slide {slide.get('slide_number')} failed: {e}")
+            return None
+
+    async def _aexpand_slide(self, doc_text, presentation_meta, slides, slide, semaphore):
+        try:
+            async with semaphore:
+                resp = await self.aclient.chat.completions.create(
+                    **self._expansion_request(self._expand_prompt(doc_text, presentation_meta, slides, slide))
+                )
+            return self._points_from(resp.choices[0].message.content)
+        except Exception as e:
+            print(f"⚠️ Expanding slide {slide.get('slide_number')} failed: {e}")
+            return None
+
+    @staticmethod
+    def _merge_points(slides, points):
+        """Puts expanded bullets into the plan structure the builder consumes"""
+        for slide, slide_points in zip(slides, points):
+            if slide_points is None:
+                FALLBACKS.inc(kind="slide_expansion")
+                slide_points = [slide.get("summary") or slide.get("title", "")]
+            slide["content_points"] = slide_points
+            slide.pop("summary", None)
@@ -0,0 +1,66 @@
+"""gunicorn settings for the PPT generator (gunicorn -c gunicorn.conf.py wsgi:app)
+
+One worker by default: the async job table, SSE streams and /metrics live in
+the worker that accepted the job, so with several workers a GET /jobs/<id>
+can land on one that has never heard of it. Its threads cover the I/O-bound
+OpenAI/Cloudinary waits, and the CPU-bound slide rendering gets the other
+cores through the render pool (PPT_RENDER_WORKERS, one process per core by
+default here). GUNICORN_WORKERS > 1 is only safe behind sticky routing, or
+when clients don't use ?async=1.
+"""
+import os
+
+
+def _cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))  # honours container CPU sets
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("GUNICORN_WORKERS", "1"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "32"))
+preload_app = True
+
+# A deck takes minutes; don't kill workers mid-request, and give them as long
+# to finish in-flight decks on shutdown/reload
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "600"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "600"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+# Several workers share img_cache/: serialize generation of one image across them
+os.environ.setdefault("IMAGE_CACHE_FILE_LOCKS", "1" if workers > 1 else "0")
+# Read when the app is preloaded, so it has to be set before then; a pool of
+# one process would only add overhead
+_render_workers = _cpu_count() if workers == 1 and _cpu_count() > 1 else 0
+os.environ.setdefault("PPT_RENDER_WORKERS", str(_render_workers))
+
+
+def when_ready(server):
+    import rate_limiter
+    for warning in rate_limiter.oversubscribed_budgets(workers):
+        server.log.warning(warning)
+    if workers > 1:
+        server.log.warning(
+            "Running %s workers: async jobs, SSE streams and /metrics are per worker, "
+            "so /jobs/<id> needs sticky routing to the worker that accepted the job", workers
+        )
+
+
+def post_fork(server, worker):
+    import wsgi
+    wsgi.on_worker_start(workers)
+
+
+def worker_exit(server, worker):
+    import wsgi
+    server.log.info("Worker %s draining in-flight jobs", worker.pid)
+    wsgi.drain()
@@ -0,0 +1,263 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+
+from metrics import REGISTRY, CallbackMetric
+from singleflight import FileLock, SingleFlight
+
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+IMAGE_CACHE_POLICY = os.getenv("IMAGE_CACHE_POLICY", "lru")  # "lru" or "lfu"
+# Serialize generation of one key across processes too (e.g. several gunicorn workers)
+IMAGE_CACHE_FILE_LOCKS = os.getenv("IMAGE_CACHE_FILE_LOCKS", "0").lower() in ("1", "true", "yes")
+
+_EVICTION_ORDER = {
+    "lru": "last_access ASC",
+    "lfu": "hits ASC, last_access ASC",
+}
+
+
+class ImageCache:
+    """Size-bounded image cache directory with a SQLite index.
+
+    The index records size, last access time and hit count for every file so
+    lookups don't touch the filesystem and eviction doesn't rescan the folder.
+    Use ImageCache.for_directory() to share one instance per directory.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+    _owner_pid = os.getpid()
+
+    @classmethod
+    def for_directory(cls, cache_dir, **kwargs):
+        key = os.path.abspath(cache_dir)
+        with cls._instances_lock:
+            if os.getpid() != cls._owner_pid:
+                # Forked child: a SQLite connection must not be shared with the parent
+                cls._instances = {}
+                cls._owner_pid = os.getpid()
+            if key not in cls._instances:
+                cls._instances[key] = cls(cache_dir, **kwargs)
+            return cls._instances[key]
+
+    def __init__(self, cache_dir, max_bytes=IMAGE_CACHE_MAX_BYTES, policy=IMAGE_CACHE_POLICY,
+                 file_locks=IMAGE_CACHE_FILE_LOCKS):
+        if policy not in _EVICTION_ORDER:
+            raise ValueError(f"Unknown image cache policy: {policy}")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.file_locks = file_locks
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._db = sqlite3.connect(
+            os.path.join(cache_dir, "index.sqlite3"),
+            timeout=30,
+            check_same_thread=False,
+            isolation_level=None  # autocommit; each statement is its own transaction
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self._import_existing_files()
+
+    def _import_existing_files(self):
+        """Indexes images written before the index existed (one-time directory scan)"""
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM entries LIMIT 1").fetchone():
+                return
+            rows = []
+            for name in os.listdir(self.cache_dir):
+                key, ext = os.path.splitext(name)
+                if ext.lower() != ".png":
+                    continue
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                rows.append((key, name, stat.st_size, stat.st_mtime, stat.st_atime))
+            if rows:
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO entries (key, filename, size, created, last_access) "
+                    "VALUES (?, ?, ?, ?, ?)", rows
+                )
+                print(f"📁 Indexed {len(rows)} existing cached images")
+        self._evict()
+
+    def path_for(self, key, ext=".png"):
+        return os.path.join(self.cache_dir, f"{key}{ext}")
+
+    def lookup(self, key, fallback_key=None):
+        """Returns the cached file path for key (or else for fallback_key), or None on a miss"""
+        for candidate in (key, fallback_key):
+            if candidate is None:
+                continue
+            path = self._existing_path(candidate)
+            if path is None:
+                continue
+            with self._lock:
+                self._db.execute(
+                    "UPDATE entries SET last_access = ?, hits = hits + 1 WHERE key = ?",
+                    (time.time(), candidate)
+                )
+                self.hits += 1
+            return path
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _peek(self, key):
+        """Like lookup() but without touching access stats"""
+        return self._existing_path(key)
+
+    def _existing_path(self, key):
+        """Path of key's file, or None; drops the entry if its file is gone
+        (evicted by another process, or deleted from outside)"""
+        with self._lock:
+            row = self._db.execute("SELECT filename FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        path = os.path.join(self.cache_dir, row[0])
+        if not os.path.exists(path):
+            self.discard(key)
+            return None
+        return path
+
+    def get_or_create(self, key, produce, ext=".png", fallback_key=None):
+        """Returns the cached path for key (or fallback_key, see lookup()), calling
+        produce(file_obj) to write it under key on a miss. Concurrent misses for
+        the same key share one produce() call; the file is written to a temp name
+        and renamed into place when complete. Exceptions from produce() propagate
+        to every waiting caller."""
+        cached = self.lookup(key, fallback_key)
+        if cached:
+            return cached
+        return self._flights.do(key, self._create, key, produce, ext)
+
+    def _create(self, key, produce, ext):
+        lock = FileLock(os.path.join(self.cache_dir, ".locks", f"{key}.lock")) if self.file_locks else nullcontext()
+        with lock:
+            # Another caller or process may have finished it while we waited
+            existing = self._peek(key)
+            if existing:
+                self.coalesced += 1
+                return existing
+
+            return self._write(key, produce, ext)
+
+    def _write(self, key, produce, ext):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f"{key}.", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                produce(f)
+            os.replace(tmp_path, self.path_for(key, ext))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return self.add(key, ext)
+
+    def put(self, key, data, ext=".png"):
+        """Stores bytes fetched elsewhere (e.g. by an async caller) atomically; returns the path"""
+        return self._write(key, lambda f: f.write(data), ext)
+
+    def add(self, key, ext=".png"):
+        """Registers a file that was just written to path_for(key, ext)"""
+        filename = f"{key}{ext}"
+        size = os.path.getsize(os.path.join(self.cache_dir, filename))
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, filename, size, created, last_access, hits) "
+                "VALUES (?, ?, ?, ?, ?, 0)",
+                (key, filename, size, now, now)
+            )
+        # The new entry has no hits yet: under LFU it would be the first victim
+        self._evict(keep=key)
+        return os.path.join(self.cache_dir, filename)
+
+    def discard(self, key):
+        """Removes an entry whose file turned out to be missing or unreadable"""
+        with self._lock:
+            row = self._db.execute("SELECT filename FROM entries WHERE key = ?", (key,)).fetchone()
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        if row:
+            self._remove_file(row[0])
+
+    def _remove_file(self, filename):
+        try:
+            os.remove(os.path.join(self.cache_dir, filename))
+        except OSError:
+            pass
+
+    def _evict(self, keep=None):
+        """Deletes entries in policy order until the directory fits the byte budget;
+        `keep` (the entry just added) is never evicted"""
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            victims = []
+            for key, filename, size in self._db.execute(
+                f"SELECT key, filename, size FROM entries WHERE key IS NOT ? "
+                f"ORDER BY {_EVICTION_ORDER[self.policy]}", (keep,)
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                victims.append((key, filename))
+                total -= size
+            self._db.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k, _ in victims])
+            self.evictions += len(victims)
+
+        for _, filename in victims:
+            self._remove_file(filename)
+        if victims:
+            print(f"🧹 Evicted {len(victims)} cached images to stay under {self.max_bytes} bytes")
+
+    def stats(self):
+        with self._lock:
+            count, total = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": count,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "policy": self.policy,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "coalesced": self.coalesced,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+def _cache_metric(name, help_text, stat, type_name):
+    def collect():
+        with ImageCache._instances_lock:
+            caches = list(ImageCache._instances.values())
+        return {(cache.cache_dir,): cache.stats()[stat] for cache in caches}
+    REGISTRY.register(CallbackMetric(name, help_text, collect, labels=("cache_dir",), type_name=type_name))
+
+
+_cache_metric("ppt_image_cache_hits_total", "Image cache hits", "hits", "counter")
+_cache_metric("ppt_image_cache_misses_total", "Image cache misses", "misses", "counter")
+_cache_metric("ppt_image_cache_evictions_total", "Images evicted to respect the byte budget", "evictions", "counter")
+_cache_metric("ppt_image_cache_coalesced_total", "Generations avoided by waiting on an in-flight one", "coalesced", "counter")
+_cache_metric("ppt_image_cache_bytes", "Bytes currently stored in the image cache", "bytes", "gauge")
+_cache_metric("ppt_image_cache_entries", "Files currently stored in the image cache", "entries", "gauge")
@@ -0,0 +1,59 @@
+import math
+import os
+
+from PIL import Image
+
+from image_cache import ImageCache
+
+IMAGE_EMBED_DPI = int(os.getenv("IMAGE_EMBED_DPI", "150"))
+IMAGE_EMBED_QUALITY = int(os.getenv("IMAGE_EMBED_QUALITY", "82"))
+# "jpeg" re-encodes opaque images as optimized JPEG; "png" always keeps PNG.
+# (python-pptx cannot embed WebP, so PNG is the fallback for images with transparency.)
+IMAGE_EMBED_FORMAT = os.getenv("IMAGE_EMBED_FORMAT", "jpeg").lower()
+
+EMU_PER_INCH = 914400
+
+
+def _has_alpha(img):
+    if img.mode in ("RGBA", "LA"):
+        return img.getchannel("A").getextrema()[0] < 255
+    return img.mode == "P" and "transparency" in img.info
+
+
+def prepare_for_frame(image_path, frame_width, frame_height, dpi=IMAGE_EMBED_DPI,
+                      fmt=IMAGE_EMBED_FORMAT, quality=IMAGE_EMBED_QUALITY):
+    """Returns a copy of image_path sized for a picture frame (EMU dimensions)
+    at `dpi`, re-encoded for size. Variants are cached next to the original in
+    its ImageCache directory, so each size is only produced once. Falls back
+    to the original path if anything goes wrong."""
+    try:
+        width_px = max(1, math.ceil(frame_width / EMU_PER_INCH * dpi))
+        height_px = max(1, math.ceil(frame_height / EMU_PER_INCH * dpi))
+
+        with Image.open(image_path) as img:
+            if img.width <= width_px and img.height <= height_px and fmt == "png":
+                return image_path  # already small enough and nothing to re-encode
+            use_jpeg = fmt == "jpeg" and not _has_alpha(img)
+
+        cache_dir, filename = os.path.split(image_path)
+        base_key = os.path.splitext(filename)[0]
+        ext = ".jpg" if use_jpeg else ".png"
+        variant_key = f"{base_key}.{width_px}x{height_px}" + (f".q{quality}" if use_jpeg else "")
+
+        def produce(out_file):
+            with Image.open(image_path) as img:
+                img = img.convert("RGB" if use_jpeg else "RGBA")
+                # Stretching to the frame's pixel size matches what PowerPoint would
+                # render; never upscale, that only adds bytes
+                size = (min(width_px, img.width), min(height_px, img.height))
+                if img.size != size:
+                    img = img.resize(size, Image.LANCZOS)
+                if use_jpeg:
+                    img.save(out_file, format="JPEG", quality=quality, optimize=True, progressive=True)
+                else:
+                    img.save(out_file, format="PNG", optimize=True)
+
+        return ImageCache.for_directory(cache_dir or ".").get_or_create(variant_key, produce, ext=ext)
+    except Exception as e:
+        print(f"⚠️ Image post-processing skipped for {image_path}: {e}")
+        return image_path
@@ -0,0 +1,277 @@
+import asyncio
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from datetime import datetime
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", "100"))
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+
+
+TERMINAL_STATUSES = ("success", "error", "cancelled")
+
+
+class JobQueueFull(Exception):
+    """Raised when the job pool already holds the maximum number of pending jobs"""
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once a client has asked to cancel it"""
+
+
+class JobManager:
+    def __init__(self, max_workers=JOB_WORKERS, queue_limit=JOB_QUEUE_LIMIT, ttl=JOB_TTL_SECONDS):
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._events_changed = threading.Condition(self._lock)
+        self._executor = None
+        self._closed = False
+        self._coroutine_futures = {}  # job_id -> concurrent Future of jobs run on an event loop
+
+    def _get_executor(self):
+        # Created lazily so the pool threads belong to the process that serves requests
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="ppt-job"
+            )
+        return self._executor
+
+    def _prune(self):
+        """Drops finished jobs older than the TTL (caller holds the lock)"""
+        cutoff = time.time() - self.ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(self, fn, *args, meta=None, **kwargs):
+        """Queues fn(*args, progress=..., **kwargs) and returns the new job id.
+
+        The job function receives a ``progress(event, **data)`` callable that
+        publishes events to /jobs/<id>/events and raises JobCancelled once the
+        job has been cancelled.
+        """
+        with self._lock:
+            job_id = self._register(meta)
+            executor = self._get_executor()
+
+        executor.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def submit_coroutine(self, runner, coro_fn, *args, meta=None, **kwargs):
+        """Like submit() for a coroutine function, run on `runner` (an
+        async_runtime.EventLoopThread) instead of a pool thread, so waiting
+        jobs don't count against max_workers. cancel() also cancels the task."""
+        with self._lock:
+            job_id = self._register(meta)
+        future = runner.submit(self._run_coroutine(job_id, coro_fn, args, kwargs))
+        with self._lock:
+            self._coroutine_futures[job_id] = future
+        future.add_done_callback(lambda f: self._forget_future(job_id, f))
+        return job_id
+
+    def _forget_future(self, job_id, future):
+        with self._lock:
+            self._coroutine_futures.pop(job_id, None)
+            job = self._jobs.get(job_id)
+            # Cancelled before the coroutine got to run: nothing else will finish the job
+            never_ran = future.cancelled() and job is not None and job["status"] not in TERMINAL_STATUSES
+        if never_ran:
+            self._cancelled(job_id)
+
+    def _register(self, meta):
+        """Creates a queued job and returns its id (caller holds the lock)"""
+        if self._closed:
+            raise JobQueueFull("Server is shutting down")
+        self._prune()
+        pending = sum(1 for job in self._jobs.values() if job["status"] in ("queued", "running"))
+        if pending >= self.queue_limit:
+            raise JobQueueFull(f"Too many pending jobs ({pending}/{self.queue_limit})")
+
+        job_id = uuid.uuid4().hex
+        self._jobs[job_id] = {
+            "job_id": job_id,
+            "status": "queued",
+            "result": None,
+            "error": None,
+            "meta": meta or {},
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "cancel_requested": False,
+            "events": [],
+        }
+        self._append_event(job_id, "job_queued", {})
+        return job_id
+
+    def _start(self, job_id):
+        """Marks a job running; returns False if it was cancelled while queued"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["cancel_requested"]:
+                if job is not None:
+                    job.update(status="cancelled", finished_at=time.time())
+                    self._append_event(job_id, "job_cancelled", {})
+                return False
+            job.update(status="running", started_at=time.time())
+            self._append_event(job_id, "job_started", {})
+            return True
+
+    def _run(self, job_id, fn, args, kwargs):
+        if not self._start(job_id):
+            return
+        try:
+            result = fn(*args, progress=self._progress_callback(job_id), **kwargs)
+        except JobCancelled:
+            self._cancelled(job_id)
+        except Exception as e:
+            self._failed(job_id, e)
+        else:
+            self._finish(job_id, "success", "job_finished", result=result)
+
+    async def _run_coroutine(self, job_id, coro_fn, args, kwargs):
+        if not self._start(job_id):
+            return
+        try:
+            result = await coro_fn(*args, progress=self._progress_callback(job_id), **kwargs)
+        except (JobCancelled, asyncio.CancelledError):
+            self._cancelled(job_id)
+        except Exception as e:
+            self._failed(job_id, e)
+        else:
+            self._finish(job_id, "success", "job_finished", result=result)
+
+    def _cancelled(self, job_id):
+        if self._finish(job_id, "cancelled", "job_cancelled"):
+            print(f"🛑 Job {job_id} cancelled")
+
+    def _failed(self, job_id, error):
+        print(f"❌ Job {job_id} failed: {error}\n{traceback.format_exc()}")
+        self._finish(job_id, "error", "job_failed", error=str(error))
+
+    def _finish(self, job_id, status, event, result=None, error=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] in TERMINAL_STATUSES:
+                return False
+            job.update(status=status, result=result, error=error, finished_at=time.time())
+            data = dict(result) if isinstance(result, dict) else {}
+            if error:
+                data["error"] = error
+            self._append_event(job_id, event, data)
+            return True
+
+    def _append_event(self, job_id, event, data):
+        """Records an event and wakes up stream readers (caller holds the lock)"""
+        job = self._jobs[job_id]
+        start = job["started_at"] or job["created_at"]
+        job["events"].append({
+            "id": len(job["events"]),
+            "event": event,
+            "elapsed": round(time.time() - start, 3),
+            "data": data,
+        })
+        self._events_changed.notify_all()
+
+    def _progress_callback(self, job_id):
+        def progress(event, **data):
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return
+                if job["cancel_requested"]:
+                    raise JobCancelled(job_id)
+                self._append_event(job_id, event, data)
+        return progress
+
+    def cancel(self, job_id):
+        """Flags a job for cancellation; returns False if it is unknown or already finished"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] in TERMINAL_STATUSES:
+                return False
+            job["cancel_requested"] = True
+            future = self._coroutine_futures.get(job_id)
+        if future is not None:
+            # Interrupts whatever the coroutine is awaiting right now
+            future.cancel()
+        return True
+
+    def iter_events(self, job_id, last_event_id=-1, keepalive=15):
+        """Yields the job's events as they arrive, or None every `keepalive` seconds
+        while waiting. Stops after the job reaches a terminal status."""
+        next_id = last_event_id + 1
+        while True:
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return
+                deadline = time.time() + keepalive
+                while len(job["events"]) <= next_id and job["status"] not in TERMINAL_STATUSES:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._events_changed.wait(timeout=remaining)
+                pending = job["events"][next_id:]
+                done = job["status"] in TERMINAL_STATUSES
+            for event in pending:
+                yield event
+            next_id += len(pending)
+            if done and not pending:
+                return
+            if not pending:
+                yield None
+
+    def get(self, job_id):
+        """Returns a JSON-serializable snapshot of the job, or None if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+
+        def iso(ts):
+            return datetime.fromtimestamp(ts).isoformat() if ts else None
+
+        snapshot = {
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "created_at": iso(job["created_at"]),
+            "started_at": iso(job["started_at"]),
+            "finished_at": iso(job["finished_at"]),
+        }
+        snapshot.update(job["meta"])
+        if job["status"] == "success" and isinstance(job["result"], dict):
+            snapshot.update(job["result"])
+        if job["status"] == "error":
+            snapshot["error"] = job["error"]
+        return snapshot
+
+    def status_counts(self):
+        """Returns {(status,): count} for the jobs still tracked"""
+        counts = {(status,): 0 for status in ("queued", "running") + TERMINAL_STATUSES}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[(job["status"],)] += 1
+        return counts
+
+    def shutdown(self, wait=True):
+        """Stops accepting work and optionally waits for running jobs to finish"""
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+            coroutine_futures = list(self._coroutine_futures.values())
+        if executor is not None:
+            executor.shutdown(wait=wait)
+        if wait and coroutine_futures:
+            wait_futures(coroutine_futures)
@@ -0,0 +1,205 @@
+import re
+from xml.sax.saxutils import escape, quoteattr
+
+from lxml import etree
+from pptx.enum.text import PP_ALIGN
+from pptx.oxml import element_class_lookup
+from pptx.oxml.ns import nsdecls
+from pptx.parts.image import Image
+from pptx.shapes.autoshape import AutoShapeType
+from pptx.util import Pt
+
+# Keeps whitespace-only text (python-pptx's parser would drop it) and gives the
+# parsed elements python-pptx's element classes, as if they had been added by it
+_parser = etree.XMLParser(resolve_entities=False)
+_parser.set_element_class_lookup(element_class_lookup)
+
+_NSDECLS = nsdecls("a", "p", "r")
+
+# The templates reproduce python-pptx 0.6.21's output for the same calls
+# (add_shape + solid fill + no line, add_textbox + the builder's text frame
+# settings, add_picture, background.fill.gradient()), so decks are identical
+# whichever backend built them.
+_SHAPE = (
+    '<p:sp><p:nvSpPr><p:cNvPr id="{id}" name="{name}"/><p:cNvSpPr/><p:nvPr/></p:nvSpPr>'
+    '<p:spPr><a:xfrm{rot}><a:off x="{x}" y="{y}"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+    '<a:prstGeom prst="{prst}"><a:avLst/></a:prstGeom>'
+    '<a:solidFill><a:srgbClr val="{fill}"/></a:solidFill><a:ln><a:noFill/></a:ln></p:spPr>'
+    '<p:style><a:lnRef idx="1"><a:schemeClr val="accent1"/></a:lnRef>'
+    '<a:fillRef idx="3"><a:schemeClr val="accent1"/></a:fillRef>'
+    '<a:effectRef idx="2"><a:schemeClr val="accent1"/></a:effectRef>'
+    '<a:fontRef idx="minor"><a:schemeClr val="lt1"/></a:fontRef></p:style>'
+    '<p:txBody><a:bodyPr rtlCol="0" anchor="ctr"/><a:lstStyle/><a:p><a:pPr algn="ctr"/></a:p></p:txBody>'
+    '</p:sp>'
+)
+_TEXTBOX = (
+    '<p:sp><p:nvSpPr><p:cNvPr id="{id}" name="TextBox {n}"/><p:cNvSpPr txBox="1"/><p:nvPr/></p:nvSpPr>'
+    '<p:spPr><a:xfrm><a:off x="{x}" y="{y}"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+    '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom><a:noFill/></p:spPr>'
+    '<p:txBody><a:bodyPr wrap="square" anchor="t" bIns="{bottom}" tIns="{top}" lIns="{left}" rIns="{right}"/>'
+    '<a:lstStyle/><a:p><a:pPr algn="{algn}"><a:lnSpc><a:spcPct val="130000"/></a:lnSpc>'
+    '<a:spcAft><a:spcPts val="1500"/></a:spcAft>'
+    '<a:defRPr sz="{sz}" b="{b}"><a:solidFill><a:srgbClr val="{color}"/></a:solidFill>'
+    '<a:latin typeface={font}/></a:defRPr></a:pPr>{runs}</a:p></p:txBody>'
+    '</p:sp>'
+)
+_PICTURE = (
+    '<p:pic><p:nvPicPr><p:cNvPr id="{id}" name="Picture {n}" descr="{descr}"/>'
+    '<p:cNvPicPr><a:picLocks noChangeAspect="1"/></p:cNvPicPr><p:nvPr/></p:nvPicPr>'
+    '<p:blipFill><a:blip r:embed="{rId}"/><a:stretch><a:fillRect/></a:stretch></p:blipFill>'
+    '<p:spPr><a:xfrm><a:off x="{x}" y="{y}"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+    '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></p:spPr>'
+    '</p:pic>'
+)
+_GRADIENT_BACKGROUND = (
+    '<p:bg {nsdecls}><p:bgPr><a:gradFill rotWithShape="1"><a:gsLst>'
+    '<a:gs pos="0"><a:srgbClr val="{start}"/></a:gs><a:gs pos="100000"><a:srgbClr val="{end}"/></a:gs>'
+    '</a:gsLst><a:lin scaled="0" ang="{ang}"/></a:gradFill><a:effectLst/></p:bgPr></p:bg>'
+)
+
+_LINE_BREAK = re.compile("\n|\v")
+_CONTROL_CHAR = re.compile(r"([\x00-\x08\x0B-\x1F])")
+
+_shape_types = {}
+
+
+def _shape_type(shape_type):
+    """(prst, basename) for an MSO_SHAPE member"""
+    if shape_type not in _shape_types:
+        autoshape = AutoShapeType(shape_type)
+        _shape_types[shape_type] = (autoshape.prst, autoshape.basename)
+    return _shape_types[shape_type]
+
+
+def _angle(degrees):
+    """ST_Angle value (60000ths of a degree, clockwise, in [0, 360))"""
+    return int(round(degrees * 60000)) % 21600000
+
+
+def _runs(text):
+    """a:r/a:br content for text, split and escaped like python-pptx's _Paragraph.text"""
+    if not isinstance(text, str):
+        raise TypeError(f"expected unicode string, got {type(text).__name__} value {text!r}")
+    parts = []
+    for index, run in enumerate(_LINE_BREAK.split(text)):
+        if index > 0:
+            parts.append("<a:br/>")
+        if run:
+            run = _CONTROL_CHAR.sub(lambda m: "_x%04X_" % ord(m.group(1)), run)
+            parts.append(f"<a:r><a:t>{escape(run)}</a:t></a:r>")
+    return "".join(parts)
+
+
+class SlideWriter:
+    """Fast rendering backend for one slide.
+
+    Shapes are formatted from the string templates above and buffered; flush()
+    parses them in a single lxml call and appends them to the slide's spTree,
+    instead of building each one through python-pptx's proxy objects (every
+    font/color/margin setter there is its own XPath lookup). Only the shape
+    vocabulary ProfessionalPPTBuilder uses is supported.
+
+    A writer created without a slide renders a blank-layout slide detached
+    from any presentation (e.g. in another process): rendered() returns the
+    buffered XML, with pictures kept as file references, and restore() puts
+    it on a real slide, where the image parts and their rIds are created.
+    """
+
+    def __init__(self, slide=None):
+        self.slide = slide
+        # A slide added from the blank layout only holds the spTree itself (id 1)
+        self._next_id = slide.shapes._next_shape_id if slide is not None else 2
+        self._shapes = []
+        self._background = None
+
+    def rendered(self):
+        """Picklable buffered content of a detached writer, for restore()"""
+        return self._background, list(self._shapes)
+
+    @classmethod
+    def restore(cls, slide, rendered):
+        """Writer for `slide` holding what a detached writer rendered; flush() it"""
+        writer = cls(slide)
+        if writer._next_id != 2:
+            raise ValueError("Rendered shapes can only be restored onto a blank slide")
+        writer._background, shapes = rendered
+        writer._shapes = list(shapes)
+        return writer
+
+    def _take_id(self):
+        shape_id = self._next_id
+        self._next_id += 1
+        return shape_id
+
+    def set_gradient_background(self, start_rgb, end_rgb, angle):
+        """Two-stop linear gradient; angle in degrees counter-clockwise from
+        left-to-right, like FillFormat.gradient_angle"""
+        self._background = _GRADIENT_BACKGROUND.format(
+            nsdecls=_NSDECLS, start=start_rgb, end=end_rgb, ang=_angle(360.0 - angle)
+        )
+
+    def add_shape(self, shape_type, x, y, cx, cy, fill_rgb, rotation=0):
+        """Auto shape with a solid fill and no outline"""
+        prst, basename = _shape_type(shape_type)
+        shape_id = self._take_id()
+        self._shapes.append(_SHAPE.format(
+            id=shape_id, name=f"{basename} {shape_id - 1}", prst=prst, fill=fill_rgb,
+            rot=f' rot="{_angle(rotation)}"' if rotation else "",
+            x=int(x), y=int(y), cx=int(cx), cy=int(cy)
+        ))
+        return shape_id
+
+    def add_textbox(self, x, y, cx, cy, text, font_size, font_name, alignment, bold, color_rgb,
+                    margins=(Pt(16), Pt(8), Pt(16), Pt(8))):
+        """Word-wrapped, top-anchored text box holding one paragraph;
+        font_size is a Length, margins are (left, top, right, bottom)"""
+        left, top, right, bottom = margins
+        shape_id = self._take_id()
+        self._shapes.append(_TEXTBOX.format(
+            id=shape_id, n=shape_id - 1, x=int(x), y=int(y), cx=int(cx), cy=int(cy),
+            left=int(left), top=int(top), right=int(right), bottom=int(bottom),
+            algn=PP_ALIGN.to_xml(alignment), sz=font_size.centipoints, b="1" if bold else "0",
+            color=color_rgb, font=quoteattr(font_name), runs=_runs(text)
+        ))
+        return shape_id
+
+    def add_picture(self, image_file, x, y, cx, cy):
+        """Picture stretched to the given frame; the image part is shared by
+        every slide that embeds the same image"""
+        if self.slide is None:
+            Image.from_file(image_file)  # unreadable images fail here, as add_picture would
+            shape_id = self._take_id()
+            self._shapes.append((image_file, shape_id, int(x), int(y), int(cx), int(cy)))
+        else:
+            image_part, rId = self.slide.part.get_or_add_image_part(image_file)
+            shape_id = self._take_id()
+            self._shapes.append(self._picture(image_part, rId, shape_id, x, y, cx, cy))
+        return shape_id
+
+    @staticmethod
+    def _picture(image_part, rId, shape_id, x, y, cx, cy):
+        return _PICTURE.format(
+            id=shape_id, n=shape_id - 1, descr=escape(image_part.desc, {'"': "&quot;"}), rId=rId,
+            x=int(x), y=int(y), cx=int(cx), cy=int(cy)
+        )
+
+    def _resolve(self, shape):
+        if isinstance(shape, str):
+            return shape
+        image_file, shape_id, x, y, cx, cy = shape
+        image_part, rId = self.slide.part.get_or_add_image_part(image_file)
+        return self._picture(image_part, rId, shape_id, x, y, cx, cy)
+
+    def flush(self):
+        """Adds everything written so far to the slide"""
+        c_sld = self.slide._element.cSld
+        if self._background is not None:
+            if c_sld.bg is not None:
+                c_sld.remove(c_sld.bg)
+            c_sld.insert(0, etree.fromstring(self._background, _parser))
+            self._background = None
+        if self._shapes:
+            shapes = "".join(self._resolve(shape) for shape in self._shapes)
+            fragment = etree.fromstring(f"<p:spTree {_NSDECLS}>{shapes}</p:spTree>", _parser)
+            c_sld.spTree.extend(list(fragment))
+            self._shapes = []
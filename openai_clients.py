@@ -0,0 +1,126 @@
+import os
+import threading
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+from rate_limiter import AsyncRateLimitedTransport, RateLimitedTransport
+
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "50"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "180"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10"))
+OPENAI_HTTP2 = os.getenv("OPENAI_HTTP2", "1").lower() in ("1", "true", "yes")
+# Proxy env vars are ignored by default to prevent proxy interference
+OPENAI_TRUST_ENV = os.getenv("OPENAI_TRUST_ENV", "0").lower() in ("1", "true", "yes")
+
+_clients = {}
+_async_clients = {}
+_clients_lock = threading.Lock()
+_owner_pid = os.getpid()
+
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401  (httpx needs it for http2=True)
+        return True
+    except ImportError:
+        return False
+
+
+def _transport_options():
+    http2 = OPENAI_HTTP2 and _http2_available()
+    if OPENAI_HTTP2 and not http2:
+        print("⚠️ OPENAI_HTTP2 is set but the 'h2' package is missing; using HTTP/1.1 keep-alive")
+    return {
+        "http2": http2,
+        "trust_env": OPENAI_TRUST_ENV,
+        "limits": httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY
+        ),
+    }
+
+
+def _build_http_client():
+    return httpx.Client(
+        # Image and chat calls share the process-wide rate limiters (see rate_limiter.py)
+        transport=RateLimitedTransport(httpx.HTTPTransport(**_transport_options())),
+        trust_env=OPENAI_TRUST_ENV,
+        timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT)
+    )
+
+
+def _build_async_http_client():
+    return httpx.AsyncClient(
+        transport=AsyncRateLimitedTransport(httpx.AsyncHTTPTransport(**_transport_options())),
+        trust_env=OPENAI_TRUST_ENV,
+        timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT)
+    )
+
+
+def _check_pid():
+    """Forked child: sockets inherited from the parent must not be reused (caller holds the lock)"""
+    global _owner_pid
+    if os.getpid() != _owner_pid:
+        _clients.clear()
+        _async_clients.clear()
+        _owner_pid = os.getpid()
+
+
+def get_openai_client(api_key=None):
+    """Returns the process-wide OpenAI client for api_key, creating it on first use.
+
+    Every planner and image generator in the process shares its connection
+    pool, so TLS sessions are reused across requests.
+    """
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    with _clients_lock:
+        _check_pid()
+        client = _clients.get(api_key)
+        if client is None:
+            client = OpenAI(
+                api_key=api_key,
+                timeout=OPENAI_TIMEOUT,
+                max_retries=0,  # retried by RateLimitedTransport, see RETRYABLE_STATUSES
+                http_client=_build_http_client()
+            )
+            _clients[api_key] = client
+        return client
+
+
+def get_async_openai_client(api_key=None):
+    """Process-wide AsyncOpenAI client for api_key.
+
+    Only use it from the shared event loop (async_runtime.event_loop): its
+    connection pool belongs to whichever loop first opens a connection.
+    """
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    with _clients_lock:
+        _check_pid()
+        client = _async_clients.get(api_key)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=api_key,
+                timeout=OPENAI_TIMEOUT,
+                max_retries=0,  # retried by RateLimitedTransport, see RETRYABLE_STATUSES
+                http_client=_build_async_http_client()
+            )
+            _async_clients[api_key] = client
+        return client
+
+
+def close_clients():
+    """Closes every pooled client (e.g. on worker shutdown)"""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+        # Async clients are dropped; their sockets go away with the event loop
+        _async_clients.clear()
+    for client in clients:
+        try:
+            client.close()
+        except Exception as e:
+            print(f"⚠️ Failed to close OpenAI client: {e}")
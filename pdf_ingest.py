@@ -0,0 +1,314 @@
+import hashlib
+import math
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from pypdf import PdfReader
+
+from image_cache import ImageCache
+
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(100 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "2000"))
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(max(1, min(8, os.cpu_count() or 1)))))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+PDF_SPOOL_DIR = os.getenv("PDF_SPOOL_DIR") or None  # None = system temp dir
+# Embedded images smaller than this (px, shorter side) are icons/bullets, not figures
+PDF_IMAGE_MIN_SIDE = int(os.getenv("PDF_IMAGE_MIN_SIDE", "200"))
+PDF_IMAGES_PER_PAGE = int(os.getenv("PDF_IMAGES_PER_PAGE", "4"))
+# An image repeated on more pages than this is a logo or page decoration
+PDF_IMAGE_MAX_REPEAT = int(os.getenv("PDF_IMAGE_MAX_REPEAT", "3"))
+PDF_IMAGE_MIN_SCORE = float(os.getenv("PDF_IMAGE_MIN_SCORE", "0.3"))
+
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+
+class PDFError(ValueError):
+    """The upload is not a PDF we can read (not a PDF, encrypted, too large...)"""
+
+
+def spool_upload(stream, max_bytes=PDF_MAX_BYTES):
+    """Copies an uploaded file stream to a temp file in 1 MB pieces.
+
+    Returns (path, sha256 hex digest, size). The caller deletes the file.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=".pdf", dir=PDF_SPOOL_DIR)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(SPOOL_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if size == 0 and not chunk.startswith(b"%PDF-"):
+                    raise PDFError("Uploaded file is not a PDF")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise PDFError(f"PDF exceeds {max_bytes // (1024 * 1024)} MB")
+                digest.update(chunk)
+                out.write(chunk)
+        if size == 0:
+            raise PDFError("Uploaded file is empty")
+        return path, digest.hexdigest(), size
+    except BaseException:
+        os.remove(path)
+        raise
+
+
+def _open(path):
+    reader = PdfReader(path)
+    if reader.is_encrypted and not reader.decrypt(""):
+        raise PDFError("PDF is password protected")
+    return reader
+
+
+def count_pages(path):
+    """Page count (reads the xref and page tree only, not the page content)"""
+    try:
+        pages = len(_open(path).pages)
+    except PDFError:
+        raise
+    except Exception as e:
+        raise PDFError(f"Could not read PDF: {e}") from e
+    if pages > PDF_MAX_PAGES:
+        raise PDFError(f"PDF has {pages} pages (limit {PDF_MAX_PAGES})")
+    return pages
+
+
+def _page_text(page, index):
+    try:
+        return (page.extract_text() or "").strip()
+    except Exception as e:  # one broken page shouldn't sink the document
+        print(f"⚠️ Skipping unreadable PDF page {index + 1}: {e}")
+        return ""
+
+
+def extract_page_range(path, start, stop):
+    """Text of pages [start, stop) joined into one section; runs in a pool process"""
+    reader = _open(path)
+    texts = [_page_text(reader.pages[index], index) for index in range(start, stop)]
+    return "\n\n".join(text for text in texts if text)
+
+
+def _page_images(page, index):
+    """Figure-sized raster images of a page as [(bytes, ext)], PNG or JPEG"""
+    images = []
+    try:
+        for image_file in page.images:
+            img = image_file.image
+            if min(img.size) < PDF_IMAGE_MIN_SIDE:
+                continue
+            ext = os.path.splitext(image_file.name)[1].lower()
+            if ext in (".png", ".jpg", ".jpeg"):
+                data = image_file.data
+            else:  # JPEG 2000, TIFF...: python-pptx can't embed these
+                out = BytesIO()
+                img.save(out, format="PNG")
+                data, ext = out.getvalue(), ".png"
+            images.append((data, ".jpg" if ext == ".jpeg" else ext))
+            if len(images) >= PDF_IMAGES_PER_PAGE:
+                break
+    except Exception as e:
+        print(f"⚠️ Skipping images of PDF page {index + 1}: {e}")
+    return images
+
+
+def extract_page_range_with_images(path, start, stop):
+    """extract_page_range() plus [(page_index, page_text, images)] for the
+    pages of the range that hold figure-sized images"""
+    reader = _open(path)
+    texts, pages = [], []
+    for index in range(start, stop):
+        page = reader.pages[index]
+        text = _page_text(page, index)
+        texts.append(text)
+        images = _page_images(page, index)
+        if images:
+            pages.append((index, text, images))
+    return "\n\n".join(text for text in texts if text), pages
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            # spawn, not fork: the parent is a threaded server process
+            _pool = ProcessPoolExecutor(
+                max_workers=PDF_EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None and _pool_pid == os.getpid():
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_pdf_sections(path, pages_per_task=PDF_PAGES_PER_TASK, page_count=None, images=None):
+    """Yields the PDF's text in page order, one section per `pages_per_task`
+    pages, extracted in the process pool.
+
+    At most two tasks per worker are in flight, so however long the document
+    is, only a few sections are held in memory at a time. When `images` (a
+    PDFImageLibrary) is given, the embedded images are extracted in the same
+    tasks and added to it.
+    """
+    page_count = count_pages(path) if page_count is None else page_count
+    pool = _get_pool()
+    task = extract_page_range if images is None else extract_page_range_with_images
+    starts = iter(range(0, page_count, pages_per_task))
+    window = deque()
+
+    def submit_next():
+        start = next(starts, None)
+        if start is not None:
+            window.append(pool.submit(task, path, start, min(start + pages_per_task, page_count)))
+
+    try:
+        for _ in range(PDF_EXTRACT_WORKERS * 2):
+            submit_next()
+        while window:
+            text = window.popleft().result()
+            submit_next()
+            if images is not None:
+                text, pages = text
+                for page in pages:
+                    images.add_page(*page)
+            if text:
+                yield text
+        if images is not None:
+            images.complete = True
+    finally:
+        for future in window:
+            future.cancel()
+
+
+_WORD = re.compile(r"[a-z][a-z0-9]+(?:-[a-z0-9]+)*")
+# Function words plus the boilerplate the planner puts in every image_concept
+_STOPWORDS = frozenset("""
+a an and are as at be by for from has have in into is it its of on or that the their this to was
+were which with will within without about over under between than then there these those
+professional illustration image images photo picture visual visualization concept representing
+showing depicting clean corporate style modern design slide content minimalist aesthetic
+""".split())
+
+
+def _terms(text):
+    return {word for word in _WORD.findall(text.lower()) if len(word) > 2 and word not in _STOPWORDS}
+
+
+class PDFImageLibrary:
+    """The figures embedded in one PDF, matched against planned slides.
+
+    Images are deduplicated by content hash and stored in the image cache;
+    each is described by the text of the page(s) it appears on. match()
+    scores that text against a slide's image_concept, section and title
+    (idf-weighted word overlap) and hands out each image at most once.
+    Assignments are keyed on the slide's title and image_concept rather than
+    its number, which can change when the finished plan is renumbered.
+    """
+
+    def __init__(self, path, page_count=None, cache_dir="img_cache"):
+        self.path = path
+        self.page_count = page_count
+        self.cache = ImageCache.for_directory(cache_dir)
+        self.complete = False
+        self._images = {}  # sha256 -> {"path", "pages", "terms"}
+        self._assigned = {}  # _slide_key(slide) -> path
+        self._used = set()
+        self._idf = None
+        self._lock = threading.Lock()
+
+    def add_page(self, page_index, text, images):
+        terms = _terms(text)
+        with self._lock:
+            for data, ext in images:
+                digest = hashlib.sha256(data).hexdigest()
+                entry = self._images.get(digest)
+                if entry is None:
+                    path = self.cache.get_or_create(f"pdf-{digest}", lambda f, data=data: f.write(data), ext)
+                    entry = self._images[digest] = {"path": path, "pages": set(), "terms": set()}
+                entry["pages"].add(page_index)
+                entry["terms"] |= terms
+            self._idf = None
+
+    def ensure_loaded(self):
+        """Extracts the images if the text sections were never iterated
+        (e.g. the slide plan came from the cache)"""
+        if not self.complete:
+            for _ in iter_pdf_sections(self.path, page_count=self.page_count, images=self):
+                pass
+
+    def __len__(self):
+        return len(self._candidates())
+
+    def _candidates(self):
+        return [entry for entry in self._images.values()
+                if entry["path"] and len(entry["pages"]) <= PDF_IMAGE_MAX_REPEAT]
+
+    def _weights(self):
+        if self._idf is None:
+            candidates = self._candidates()
+            counts = {}
+            for entry in candidates:
+                for term in entry["terms"]:
+                    counts[term] = counts.get(term, 0) + 1
+            self._idf = {term: math.log((len(candidates) + 1) / (n + 1)) + 1 for term, n in counts.items()}
+        return self._idf
+
+    @staticmethod
+    def _slide_key(slide):
+        return slide.get("title", ""), slide.get("image_concept", "")
+
+    def retain(self, slides):
+        """Frees the images matched to slides that are not in `slides` (e.g.
+        streamed slides the final plan dropped), so other slides can use them"""
+        keep = {self._slide_key(slide) for slide in slides}
+        with self._lock:
+            for key in [k for k in self._assigned if k not in keep]:
+                self._used.discard(self._assigned.pop(key))
+
+    def match(self, slide):
+        """Path of the best unused image for the slide, or None if nothing
+        scores PDF_IMAGE_MIN_SCORE. Repeated calls for a slide give the same
+        answer."""
+        slide_key = self._slide_key(slide)
+        with self._lock:
+            if slide_key in self._assigned:
+                return self._assigned[slide_key]
+            idf = self._weights()
+            query = _terms(" ".join(str(slide.get(key, "")) for key in ("image_concept", "section", "title")))
+            known = query & idf.keys()
+            if not known:
+                return None
+            total = sum(idf[term] for term in known)
+
+            best, best_score = None, 0.0
+            for entry in self._candidates():
+                if entry["path"] in self._used:
+                    continue
+                shared = known & entry["terms"]
+                score = sum(idf[term] for term in shared) / total
+                if len(shared) >= 2 and score >= PDF_IMAGE_MIN_SCORE and score > best_score:
+                    best, best_score = entry, score
+            if best is None:
+                return None
+            self._used.add(best["path"])
+            self._assigned[slide_key] = best["path"]
+            return best["path"]
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import unicodedata
+
+PLAN_CACHE_DIR = os.getenv("PLAN_CACHE_DIR", "plan_cache")
+PLAN_CACHE_TTL = int(os.getenv("PLAN_CACHE_TTL", str(7 * 24 * 3600)))
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "1000"))
+PLAN_CACHE_MAX_BYTES = int(os.getenv("PLAN_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+
+
+def normalize_text(text):
+    """Collapses insignificant differences (unicode forms, whitespace) in a summary"""
+    text = unicodedata.normalize("NFC", text or "")
+    return " ".join(text.split())
+
+
+class DiskPlanCacheBackend:
+    """Stores one JSON file per key; access time is tracked through the file mtime"""
+
+    def __init__(self, directory=PLAN_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # mark as recently used
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key, entry):
+        # Write to a temp file and rename so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def entries(self):
+        """Yields (key, size_in_bytes, last_used) for every stored entry"""
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            yield name[:-len(".json")], stat.st_size, stat.st_mtime
+
+
+class MemoryPlanCacheBackend:
+    """In-process backend, mainly useful for tests and single-worker setups"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            item["last_used"] = time.time()
+            return json.loads(item["data"])
+
+    def set(self, key, entry):
+        data = json.dumps(entry)
+        with self._lock:
+            self._entries[key] = {"data": data, "last_used": time.time()}
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def entries(self):
+        with self._lock:
+            return [(k, len(v["data"]), v["last_used"]) for k, v in self._entries.items()]
+
+
+class PlanCache:
+    """TTL + size bounded cache for slide plans.
+
+    Any object with get/set/delete/entries (see DiskPlanCacheBackend) can be
+    used as the backend.
+    """
+
+    def __init__(self, backend=None, ttl=PLAN_CACHE_TTL,
+                 max_entries=PLAN_CACHE_MAX_ENTRIES, max_bytes=PLAN_CACHE_MAX_BYTES):
+        self.backend = backend if backend is not None else DiskPlanCacheBackend()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(doc_text, slide_count, model, prompt_version):
+        raw = json.dumps([normalize_text(doc_text), int(slide_count), model, prompt_version])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        entry = self.backend.get(key)
+        if entry is None or time.time() - entry.get("stored_at", 0) > self.ttl:
+            if entry is not None:
+                self.backend.delete(key)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["value"]
+
+    def set(self, key, value):
+        try:
+            self.backend.set(key, {"stored_at": time.time(), "value": value})
+            self._evict()
+        except Exception as e:
+            print(f"⚠️ Plan cache write failed: {e}")
+
+    def _evict(self):
+        """Drops least recently used entries until both limits are respected"""
+        entries = sorted(self.backend.entries(), key=lambda e: e[2])
+        total_bytes = sum(size for _, size, _ in entries)
+        count = len(entries)
+        for key, size, _ in entries:
+            if count <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            self.backend.delete(key)
+            count -= 1
+            total_bytes -= size
@@ -0,0 +1,107 @@
+import json
+import re
+
+from plan_stream import ContentSlidesScanner
+
+
+def _object(properties):
+    # Structured outputs (strict) need every property required and no extras
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+_STRING = {"type": "string"}
+_INTEGER = {"type": "integer"}
+
+SLIDE_SCHEMA = _object({
+    "slide_number": _INTEGER,
+    "section": _STRING,
+    "title": _STRING,
+    "content_points": {"type": "array", "items": _STRING},
+    "slide_type": {"type": "string", "enum": ["text_heavy", "image_slide"]},
+    "has_image": {"type": "boolean"},
+    "image_concept": _STRING,
+})
+
+OUTLINE_SLIDE_SCHEMA = _object({
+    "slide_number": _INTEGER,
+    "section": _STRING,
+    "title": _STRING,
+    "summary": _STRING,
+    "image_concept": _STRING,
+})
+
+# Key order matters: content_slides comes last so everything before it has
+# already been written when a completion is cut off
+_HEADER = {
+    "presentation_meta": _object({
+        "title": _STRING,
+        "subtitle": _STRING,
+        "total_content_slides": _INTEGER,
+        "estimated_duration": _STRING,
+    }),
+    "theme": _object({
+        "name": _STRING,
+        "style": _STRING,
+        "palette_index": _INTEGER,
+        "mood": _STRING,
+    }),
+    "table_of_contents": {"type": "array", "items": _object({
+        "section_number": _INTEGER,
+        "section_title": _STRING,
+        "slides": {"type": "array", "items": _INTEGER},
+    })},
+}
+
+PLAN_SCHEMA = _object(dict(_HEADER, content_slides={"type": "array", "items": SLIDE_SCHEMA}))
+OUTLINE_SCHEMA = _object(dict(_HEADER, content_slides={"type": "array", "items": OUTLINE_SLIDE_SCHEMA}))
+POINTS_SCHEMA = _object({"content_points": {"type": "array", "items": _STRING}})
+SLIDES_SCHEMA = _object({"content_slides": {"type": "array", "items": SLIDE_SCHEMA}})
+OUTLINE_SLIDES_SCHEMA = _object({"content_slides": {"type": "array", "items": OUTLINE_SLIDE_SCHEMA}})
+
+
+def response_format(name, schema):
+    """response_format argument enforcing `schema` via structured outputs"""
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+
+_CONTENT_SLIDES_KEY = re.compile(r'"content_slides"\s*:')
+
+
+def repair_plan(raw):
+    """Salvages a truncated or malformed plan completion.
+
+    Returns (data, repaired): `data` has the usual top-level keys and every
+    content slide that parsed on its own; the header is recovered from the
+    text before "content_slides" when possible and left empty otherwise.
+    """
+    try:
+        data = json.loads(raw)
+        if isinstance(data, dict):
+            return data, False
+    except ValueError:
+        pass
+
+    scanner = ContentSlidesScanner()
+    slides = scanner.feed(raw)
+
+    header = {}
+    match = _CONTENT_SLIDES_KEY.search(raw)
+    start = raw.find("{")
+    if match and 0 <= start < match.start():
+        head = raw[start:match.start()].rstrip().rstrip(",")
+        try:
+            header = json.loads(head + "}")
+        except ValueError:
+            header = {}
+
+    return {
+        "presentation_meta": header.get("presentation_meta", {}),
+        "theme": header.get("theme", {}),
+        "table_of_contents": header.get("table_of_contents", []),
+        "content_slides": slides,
+    }, True
@@ -0,0 +1,72 @@
+import json
+
+
+class ContentSlidesScanner:
+    """Incrementally scans a streamed slide-plan JSON document and hands back
+    each object of the top-level "content_slides" array as soon as it closes.
+
+    Usage:
+        scanner = ContentSlidesScanner()
+        for chunk in stream:
+            for slide in scanner.feed(chunk):
+                ...
+    """
+
+    def __init__(self, key="content_slides"):
+        self.key = key
+        self.text = ""
+        self.done = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        self._array_depth = None
+        self._object_start = None
+
+    def feed(self, chunk):
+        """Consumes the next piece of text; returns the slides completed by it"""
+        self.text += chunk
+        completed = []
+        text = self.text
+
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = text[self._string_start + 1:i]
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in "{[":
+                self._depth += 1
+                if (ch == "[" and self._depth == 2 and self._array_depth is None
+                        and self._last_string == self.key):
+                    self._array_depth = 2
+                elif ch == "{" and self._array_depth and self._depth == self._array_depth + 1:
+                    self._object_start = i
+            elif ch in "}]":
+                if (ch == "}" and self._object_start is not None
+                        and self._depth == self._array_depth + 1):
+                    try:
+                        completed.append(json.loads(text[self._object_start:i + 1]))
+                    except ValueError:
+                        pass
+                    self._object_start = None
+                elif ch == "]" and self._array_depth and self._depth == self._array_depth:
+                    self._array_depth = 0
+                    self.done = True
+                self._depth -= 1
+
+        self._pos = len(text)
+        return completed
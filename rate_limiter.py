@@ -0,0 +1,393 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+from metrics import REGISTRY, CallbackMetric
+
+OPENAI_IMAGE_RPM = float(os.getenv("OPENAI_IMAGE_RPM", "50"))
+OPENAI_IMAGE_CONCURRENCY = int(os.getenv("OPENAI_IMAGE_CONCURRENCY", "10"))
+OPENAI_CHAT_RPM = float(os.getenv("OPENAI_CHAT_RPM", "500"))
+OPENAI_CHAT_CONCURRENCY = int(os.getenv("OPENAI_CHAT_CONCURRENCY", "20"))
+OPENAI_RATE_LIMIT_RETRIES = int(os.getenv("OPENAI_RATE_LIMIT_RETRIES", "4"))
+OPENAI_BACKOFF_BASE = float(os.getenv("OPENAI_BACKOFF_BASE", "1.0"))
+OPENAI_BACKOFF_MAX = float(os.getenv("OPENAI_BACKOFF_MAX", "60"))
+
+# What the OpenAI SDK retries by itself; its retries are off (max_retries=0 in
+# openai_clients) so that these transports are the only retry layer
+RETRYABLE_STATUSES = (408, 409, 429, 500, 502, 503, 504)
+
+
+class RateLimiter:
+    """Token bucket (requests per minute) plus a cap on in-flight calls.
+
+    One instance is shared by every thread calling the same API, so N
+    concurrent decks queue behind a single budget instead of each firing
+    its own burst.
+    """
+
+    def __init__(self, name, requests_per_minute, max_concurrent, burst=None):
+        self.name = name
+        self._lock = threading.Lock()
+        self.configure(requests_per_minute, max_concurrent, burst)
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.waiting = 0
+        self.in_flight = 0
+        self.wait_seconds = 0.0
+        self.throttled = 0
+        self.retries = 0
+
+    def configure(self, requests_per_minute, max_concurrent, burst=None):
+        """Resets the budget. Only safe before any call is in flight (e.g. right after fork)."""
+        max_concurrent = max(1, int(max_concurrent))
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(burst or max_concurrent)
+        self.max_concurrent = max_concurrent
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+
+    def _try_take_token(self):
+        """Takes a token and returns 0, or returns how long to wait for the next one"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def _take_token(self):
+        while True:
+            delay = self._try_take_token()
+            if not delay:
+                return
+            time.sleep(delay)
+
+    def acquire(self):
+        """Blocks until both a rate token and an in-flight slot are available"""
+        start = time.monotonic()
+        with self._stats_lock:
+            self.waiting += 1
+        try:
+            self._slots.acquire()
+            try:
+                self._take_token()
+            except BaseException:
+                self._slots.release()
+                raise
+        except BaseException:
+            with self._stats_lock:
+                self.waiting -= 1
+            raise
+        self._acquired(start)
+
+    async def acquire_async(self, poll_interval=0.05):
+        """acquire() for coroutines: waits without blocking the event loop, and
+        shares the same budget as the threads calling acquire()"""
+        start = time.monotonic()
+        with self._stats_lock:
+            self.waiting += 1
+        try:
+            while not self._slots.acquire(blocking=False):
+                await asyncio.sleep(poll_interval)
+            try:
+                while True:
+                    delay = self._try_take_token()
+                    if not delay:
+                        break
+                    await asyncio.sleep(delay)
+            except BaseException:
+                self._slots.release()
+                raise
+        except BaseException:
+            with self._stats_lock:
+                self.waiting -= 1
+            raise
+        self._acquired(start)
+
+    def _acquired(self, start):
+        waited = time.monotonic() - start
+        with self._stats_lock:
+            self.waiting -= 1
+            self.calls += 1
+            self.in_flight += 1
+            self.wait_seconds += waited
+
+    def release(self):
+        with self._stats_lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def record_retry(self):
+        """A call retried after a connection error or timeout"""
+        with self._stats_lock:
+            self.retries += 1
+
+    def record_throttle(self, retried):
+        with self._stats_lock:
+            self.throttled += 1
+            if retried:
+                self.retries += 1
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "calls": self.calls,
+                "waiting": self.waiting,
+                "in_flight": self.in_flight,
+                "wait_seconds_total": round(self.wait_seconds, 3),
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "requests_per_minute": self.rate * 60,
+                "max_concurrent": self.max_concurrent,
+            }
+
+
+image_limiter = RateLimiter("image", OPENAI_IMAGE_RPM, OPENAI_IMAGE_CONCURRENCY)
+chat_limiter = RateLimiter("chat", OPENAI_CHAT_RPM, OPENAI_CHAT_CONCURRENCY)
+
+
+def split_between_processes(processes):
+    """Gives each of `processes` workers an equal share of the configured budgets,
+    so N preforked workers together stay within the account's limits."""
+    processes = max(1, int(processes))
+    image_limiter.configure(OPENAI_IMAGE_RPM / processes, OPENAI_IMAGE_CONCURRENCY / processes)
+    chat_limiter.configure(OPENAI_CHAT_RPM / processes, OPENAI_CHAT_CONCURRENCY / processes)
+
+
+def oversubscribed_budgets(processes):
+    """Warnings for the concurrency budgets `processes` workers can't split:
+    every worker keeps at least one slot, so together they may exceed them"""
+    warnings = []
+    for name, budget in (("IMAGE", OPENAI_IMAGE_CONCURRENCY), ("CHAT", OPENAI_CHAT_CONCURRENCY)):
+        if budget < processes:
+            warnings.append(f"{processes} workers share OPENAI_{name}_CONCURRENCY={budget}: up to {processes} "
+                            f"calls can be in flight; run at most {budget} workers to stay within it")
+    return warnings
+
+
+def _limiter_metric(name, help_text, stat, type_name):
+    REGISTRY.register(CallbackMetric(
+        name, help_text,
+        lambda: {(l.name,): l.stats()[stat] for l in (image_limiter, chat_limiter)},
+        labels=("api",), type_name=type_name
+    ))
+
+
+_limiter_metric("openai_requests_total", "OpenAI calls let through the limiter", "calls", "counter")
+_limiter_metric("openai_limiter_wait_seconds_total", "Time spent queued in the limiter", "wait_seconds_total", "counter")
+_limiter_metric("openai_throttled_total", "Retryable 408/409/429/5xx responses received", "throttled", "counter")
+_limiter_metric("openai_retries_total", "Calls retried after a retryable response or connection error", "retries", "counter")
+_limiter_metric("openai_in_flight", "OpenAI calls currently in flight", "in_flight", "gauge")
+_limiter_metric("openai_waiting", "Calls queued for a limiter slot", "waiting", "gauge")
+
+
+def limiter_for_path(path):
+    """Picks the shared limiter for an OpenAI API path (None = not limited)"""
+    if "/images/" in path:
+        return image_limiter
+    if "/chat/" in path or "/responses" in path:
+        return chat_limiter
+    return None
+
+
+def retry_after_seconds(headers):
+    """Parses Retry-After / retry-after-ms into seconds, or None"""
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def backoff_delay(attempt, headers=None):
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After"""
+    delay = random.uniform(0, min(OPENAI_BACKOFF_MAX, OPENAI_BACKOFF_BASE * (2 ** attempt)))
+    server_delay = retry_after_seconds(headers or {})
+    if server_delay is not None:
+        delay = max(delay, min(server_delay, OPENAI_BACKOFF_MAX))
+    return delay
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Keeps the limiter slot until a (possibly streamed) response is closed"""
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._release_once()
+
+    def _release_once(self):
+        if not self._released:
+            self._released = True
+            self._release()
+
+    def __del__(self):
+        # Backstop for responses dropped without close(): the slot would
+        # otherwise be lost for the life of the process
+        self._release_once()
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """httpx transport that routes OpenAI image and chat calls through the
+    shared limiters and retries 429/5xx responses, connection errors and
+    timeouts with jittered backoff."""
+
+    def __init__(self, transport, max_retries=OPENAI_RATE_LIMIT_RETRIES):
+        self._transport = transport
+        self.max_retries = max_retries
+
+    def handle_request(self, request):
+        limiter = limiter_for_path(request.url.path)
+        if limiter is None:
+            return self._transport.handle_request(request)
+
+        attempt = 0
+        while True:
+            limiter.acquire()
+            try:
+                response = self._transport.handle_request(request)
+            except httpx.TransportError as e:
+                limiter.release()
+                if attempt >= self.max_retries:
+                    raise
+                limiter.record_retry()
+                delay = backoff_delay(attempt)
+                print(f"⏳ OpenAI {limiter.name} call failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                limiter.release()
+                raise
+
+            if response.status_code in RETRYABLE_STATUSES and attempt < self.max_retries:
+                response.close()
+                limiter.release()
+                limiter.record_throttle(retried=True)
+                delay = backoff_delay(attempt, response.headers)
+                print(f"⏳ OpenAI {limiter.name} call got {response.status_code}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            if response.status_code in RETRYABLE_STATUSES:
+                limiter.record_throttle(retried=False)
+            return httpx.Response(
+                status_code=response.status_code,
+                headers=response.headers,
+                stream=_ReleasingStream(response.stream, limiter.release),
+                extensions=response.extensions,
+            )
+
+    def close(self):
+        self._transport.close()
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    """_ReleasingStream for the async transport"""
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release_once()
+
+    def _release_once(self):
+        if not self._released:
+            self._released = True
+            self._release()
+
+    def __del__(self):
+        # Same backstop as _ReleasingStream.__del__
+        self._release_once()
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """RateLimitedTransport for httpx.AsyncClient / AsyncOpenAI"""
+
+    def __init__(self, transport, max_retries=OPENAI_RATE_LIMIT_RETRIES):
+        self._transport = transport
+        self.max_retries = max_retries
+
+    async def handle_async_request(self, request):
+        limiter = limiter_for_path(request.url.path)
+        if limiter is None:
+            return await self._transport.handle_async_request(request)
+
+        attempt = 0
+        while True:
+            await limiter.acquire_async()
+            try:
+                response = await self._transport.handle_async_request(request)
+            except httpx.TransportError as e:
+                limiter.release()
+                if attempt >= self.max_retries:
+                    raise
+                limiter.record_retry()
+                delay = backoff_delay(attempt)
+                print(f"⏳ OpenAI {limiter.name} call failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                limiter.release()
+                raise
+
+            if response.status_code in RETRYABLE_STATUSES and attempt < self.max_retries:
+                await response.aclose()
+                limiter.release()
+                limiter.record_throttle(retried=True)
+                delay = backoff_delay(attempt, response.headers)
+                print(f"⏳ OpenAI {limiter.name} call got {response.status_code}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+
+            if response.status_code in RETRYABLE_STATUSES:
+                limiter.record_throttle(retried=False)
+            return httpx.Response(
+                status_code=response.status_code,
+                headers=response.headers,
+                stream=_AsyncReleasingStream(response.stream, limiter.release),
+                extensions=response.extensions,
+            )
+
+    async def aclose(self):
+        await self._transport.aclose()
@@ -0,0 +1,132 @@
+import os
+
+import cloudinary.uploader
+import cloudinary.utils
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(6 * 1024 * 1024)))
+# Opt-in: keep a local copy of the deck when the upload fails instead of erroring
+PPT_LOCAL_FALLBACK = os.getenv("PPT_LOCAL_FALLBACK", "0").lower() in ("1", "true", "yes")
+
+
+class BufferReader:
+    """Read-only file view over a BytesIO's buffer.
+
+    Reads slice the underlying memory chunk by chunk, so the deck is never
+    copied as a whole, and close() leaves the buffer usable (the Cloudinary
+    uploader closes whatever it is given).
+    """
+
+    def __init__(self, buffer, name="stream"):
+        self._view = buffer.getbuffer()
+        self._pos = 0
+        self.name = name
+
+    def read(self, size=-1):
+        end = len(self._view) if size is None or size < 0 else min(len(self._view), self._pos + size)
+        data = self._view[self._pos:end].tobytes()
+        self._pos = end
+        return data
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self._pos
+        elif whence == os.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, min(offset, len(self._view)))
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        self._view.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class ChunkedUpload:
+    """Write-only stream that uploads to Cloudinary while it is written.
+
+    Uses upload_large's chunk protocol: each chunk_size piece is sent once
+    more data follows it, with the total size left open (-1), and finish()
+    sends the last piece with the real total. At most one chunk is held in
+    memory, and nothing is sent for files smaller than a chunk until
+    finish().
+    """
+
+    def __init__(self, public_id, filename=None, chunk_size=UPLOAD_CHUNK_SIZE):
+        self.name = filename or f"{os.path.basename(public_id)}.pptx"
+        self.chunk_size = chunk_size
+        self.size = 0
+        self._sent = 0
+        self._pending = bytearray()
+        self._upload_id = cloudinary.utils.random_public_id()
+        self._options = {"resource_type": "raw", "public_id": public_id, "overwrite": True}
+
+    def write(self, data):
+        self._pending += data
+        self.size += len(data)
+        while len(self._pending) > self.chunk_size:
+            self._send(self.chunk_size, total=-1)
+        return len(data)
+
+    def tell(self):
+        return self.size
+
+    def flush(self):
+        pass
+
+    def _send(self, length, total):
+        chunk = bytes(self._pending[:length])
+        del self._pending[:length]
+        headers = {
+            "Content-Range": f"bytes {self._sent}-{self._sent + length - 1}/{total}",
+            "X-Unique-Upload-Id": self._upload_id,
+        }
+        result = cloudinary.uploader.upload_large_part((self.name, chunk), http_headers=headers, **self._options)
+        self._options["public_id"] = result.get("public_id")
+        self._sent += length
+        return result
+
+    def finish(self):
+        """Sends what is left; returns the secure URL"""
+        if not self.size:
+            raise ValueError("Nothing to upload")
+        return self._send(len(self._pending), total=self.size)["secure_url"]
+
+
+class CloudinaryStorage:
+    """Uploads decks to Cloudinary as raw resources, from memory or while they are written"""
+
+    def __init__(self, chunk_size=UPLOAD_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
+    def upload(self, buffer, public_id, filename=None):
+        """Uploads a BytesIO without writing it to disk; returns the secure URL"""
+        filename = filename or f"{os.path.basename(public_id)}.pptx"
+        with BufferReader(buffer, name=filename) as reader:
+            # upload_large sends chunk_size pieces; decks under one chunk go in a single request
+            result = cloudinary.uploader.upload_large(
+                reader,
+                resource_type="raw",
+                public_id=public_id,
+                overwrite=True,
+                chunk_size=self.chunk_size
+            )
+        return result["secure_url"]
+
+    def open_upload(self, public_id, filename=None):
+        """ChunkedUpload to write a deck into as it is built"""
+        return ChunkedUpload(public_id, filename=filename, chunk_size=self.chunk_size)
+
+
+def save_local_copy(buffer, path):
+    """Writes a BytesIO to disk straight from its buffer (no getvalue() copy)"""
+    with open(path, "wb") as f, buffer.getbuffer() as view:
+        f.write(view)
+    return os.path.abspath(path)
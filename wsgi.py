@@ -0,0 +1,44 @@
+"""WSGI entry point for production serving:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+gunicorn.conf.py preloads this module in the master process, so the app,
+the palettes and the default template are loaded once and shared with every
+forked worker. The hooks below run inside each worker.
+"""
+from PIL import Image
+
+import engine
+import fullscreen
+import pdf_ingest
+import rate_limiter
+from async_runtime import event_loop
+from openai_clients import close_clients
+
+app = fullscreen.app
+
+
+def warm_up():
+    """Loads what every request needs before the workers are forked"""
+    engine.new_presentation()  # reads the template bytes and imports the pptx parts
+    engine.compile_templates()  # one styled master per palette
+    Image.init()  # registers all PIL codecs up front
+    print(f"🔥 Preloaded {len(engine.PROFESSIONAL_PALETTES)} palettes and their compiled deck templates")
+
+
+def on_worker_start(workers):
+    """Per-worker setup, called right after fork"""
+    # The pipeline picks up a fresh pooled OpenAI client in each worker by itself
+    rate_limiter.split_between_processes(workers)
+
+
+def drain():
+    """Waits for in-flight async decks, then closes the pooled HTTP clients"""
+    fullscreen.job_manager.shutdown(wait=True)
+    event_loop.stop()
+    pdf_ingest.shutdown_pool()
+    engine.shutdown_render_pool()
+    close_clients()
+
+
+warm_up()